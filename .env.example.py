@@ -6,12 +6,70 @@ TELEGRAM_PHONE=+540000000000
 # BlueDay / ClubUno
 BLUEDAY_USER=tu_usuario
 BLUEDAY_PASS=tu_contraseña
+BLUEDAY_URL=https://admin.clubuno.net
+# Hilos de Selenium y navegadores logueados (0 = según núcleos y memoria)
+BLUEDAY_WORKERS=0
+BLUEDAY_POOL_SIZE=0
+BLUEDAY_MB_POR_NAVEGADOR=350
+# rapido = espera condiciones (modales, AJAX); legacy = pausas fijas
+BLUEDAY_MODO=rapido
+# Cargas de fichas agrupadas en un mismo navegador: ventana (s, 0 = sin agrupar) y máximo por tanda
+BLUEDAY_LOTE_VENTANA=0.5
+BLUEDAY_LOTE_MAX=10
+# selenium = navegador por operación; http = endpoints del panel con las cookies de Selenium
+BLUEDAY_BACKEND=selenium
+# Rutas del panel para el backend HTTP (JSON, solo las que cambian)
+BLUEDAY_HTTP_ENDPOINTS={}
+BLUEDAY_HTTP_TIMEOUT=15
+# completo = Chrome normal; liviano = headless, sin imágenes/fuentes/multimedia, carga eager
+BLUEDAY_CHROME_PERFIL=completo
+# Carpeta donde guardar los perfiles de Chrome (cookies y cache entre reinicios)
+BLUEDAY_CHROME_DATOS=
 
 # MySQL
 DB_HOST=localhost
 DB_USER=root
 DB_PASSWORD=tu_password
 DB_NAME=claro_pay
+DB_POOL_SIZE=5
+DB_POOL_RECYCLE=300
+
+# Lectura de correos (IMAP)
+IMAP_HOST=imap.gmail.com
+IMAP_PORT=993
+IMAP_SSL=1
+IMAP_IDLE_SEGUNDOS=1500
+IMAP_NOOP_SEGUNDOS=2
+IMAP_TIMEOUT=60
+# Cuántas cuentas pueden estar logueándose a la vez
+IMAP_MAX_LOGINS=5
+
+# Sesiones de usuarios en memoria
+SESIONES_MAX=5000
+SESIONES_TTL_SEGUNDOS=3600
+
+# Cada cuántos segundos se vuelcan a MySQL los cambios de estado de los usuarios
+USUARIOS_VOLCADO_SEGUNDOS=1
+
+# Métricas en formato Prometheus (http://HOST:PUERTO/metrics). 0 = desactivadas
+METRICAS_HOST=127.0.0.1
+METRICAS_PUERTO=9108
+
+# Rotación de cuentas Claro Pay: round_robin | ponderada | lru
+ROTACION_ESTRATEGIA=round_robin
+ROTACION_PERSISTIR_CADA=10
+ROTACION_CACHE_SEGUNDOS=300
+
+# Vigencia de los ingresos detectados (segundos) y filas por tanda al vencerlos
+MOVIMIENTOS_TTL_SEGUNDOS=600
+MOVIMIENTOS_BORRADO_LOTE=500
+
+# Cuánto se espera la transferencia de un jugador que confirmó un monto (segundos)
+DEPOSITO_ESPERA_SEGUNDOS=900
+
+# Avisos de caja: ventana para juntar ingresos en un mensaje y máximo por mensaje
+CAJA_VENTANA_SEGUNDOS=1.5
+CAJA_MAX_POR_MENSAJE=20
 
 # Telegram IDs
 OPERADOR_ID=123456789
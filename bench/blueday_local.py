@@ -0,0 +1,284 @@
+"""
+Servidor local que imita al panel de BlueDay, para probar el bot sin conexión.
+
+Sirve las páginas del panel con los mismos IDs y XPaths que usa Selenium
+(blueday_paginas.py) y los endpoints del backend HTTP (ver
+ENDPOINTS_BLUEDAY_HTTP en src/bot.py), con jugadores en memoria, una demora
+configurable por pedido y otra al abrir modales y menús.
+
+Uso:
+    python bench/blueday_local.py                 # prueba el backend HTTP contra el servidor
+    python bench/blueday_local.py --servir 8089   # solo deja el servidor levantado
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from blueday_paginas import pagina_login, pagina_panel, pagina_usuarios
+
+USUARIO_ADMIN = "admin"
+CONTRASENA_ADMIN = "admin"
+
+
+class EstadoBlueDay:
+    """
+    Jugadores y sesiones del panel simulado.
+    """
+
+    def __init__(self):
+        self.jugadores = {}  # username -> {"password", "balance", "locked"}
+        self.sesiones = set()
+        self.pedidos = 0
+        self.lock = threading.Lock()
+
+    def agregar_jugador(self, nombre: str, saldo: float = 0.0, bloqueado: bool = False):
+        with self.lock:
+            self.jugadores[nombre] = {"password": "abc123", "balance": saldo, "locked": bloqueado}
+
+    def expirar_sesiones(self):
+        with self.lock:
+            self.sesiones.clear()
+
+
+class ManejadorBlueDay(BaseHTTPRequestHandler):
+    estado: EstadoBlueDay = None
+    demora = 0.0
+    demora_ui = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    # -------------------- utilidades --------------------
+
+    def _campos(self) -> dict:
+        consulta = parse_qs(urlparse(self.path).query)
+        largo = int(self.headers.get("Content-Length") or 0)
+        if largo:
+            consulta.update(parse_qs(self.rfile.read(largo).decode()))
+        return {k: v[0] for k, v in consulta.items()}
+
+    def _sesion_valida(self) -> bool:
+        for parte in (self.headers.get("Cookie") or "").split(";"):
+            nombre, _, valor = parte.strip().partition("=")
+            if nombre == "PHPSESSID" and valor in self.estado.sesiones:
+                return True
+        return False
+
+    def _responder(self, codigo: int, cuerpo: bytes = b"", tipo="application/json", headers=None):
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _json(self, datos: dict):
+        self._responder(200, json.dumps(datos).encode())
+
+    def _al_login(self):
+        self._responder(302, headers={"Location": "/login"})
+
+    # -------------------- rutas --------------------
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def _atender(self, metodo: str):
+        if self.demora:
+            time.sleep(self.demora)
+        with self.estado.lock:
+            self.estado.pedidos += 1
+
+        ruta = urlparse(self.path).path
+        campos = self._campos()
+
+        if ruta == "/login" and metodo == "POST":
+            return self._login(campos)
+        if ruta in ("/", "/usuarios") and metodo == "GET":
+            return self._pagina(ruta)
+        if ruta.startswith("/api/"):
+            if not self._sesion_valida():
+                return self._al_login()
+            return self._api(ruta, campos)
+        self._responder(404, b"{}")
+
+    def _pagina(self, ruta: str):
+        if not self._sesion_valida():
+            html = pagina_login()
+        elif ruta == "/usuarios":
+            html = pagina_usuarios(int(self.demora_ui * 1000))
+        else:
+            html = pagina_panel(int(self.demora_ui * 1000))
+        self._responder(200, html.encode(), tipo="text/html; charset=utf-8")
+
+    def _login(self, campos: dict):
+        if campos.get("user") != USUARIO_ADMIN or campos.get("passwd") != CONTRASENA_ADMIN:
+            return self._responder(401, b'{"ok": false}')
+        token = secrets.token_hex(16)
+        with self.estado.lock:
+            self.estado.sesiones.add(token)
+        self._responder(
+            302, headers={"Location": "/", "Set-Cookie": f"PHPSESSID={token}; Path=/"}
+        )
+
+    def _api(self, ruta: str, campos: dict):
+        jugadores = self.estado.jugadores
+        nombre = campos.get("username", "")
+
+        with self.estado.lock:
+            if ruta == "/api/users/search":
+                # La coincidencia exacta primero, como en el buscador del panel
+                encontrados = [
+                    {"username": n, "balance": j["balance"], "locked": j["locked"]}
+                    for n, j in sorted(jugadores.items(), key=lambda t: (t[0] != nombre, t[0]))
+                    if nombre.lower() in n.lower()
+                ]
+                return self._json({"ok": True, "users": encontrados})
+
+            if ruta == "/api/users/new":
+                if not nombre or nombre in jugadores:
+                    return self._json({"ok": False, "error": "usuario existente"})
+                jugadores[nombre] = {
+                    "password": campos.get("password", ""),
+                    "balance": 0.0,
+                    "locked": False,
+                }
+                return self._json({"ok": True})
+
+            jugador = jugadores.get(nombre)
+            if jugador is None:
+                return self._json({"ok": False, "error": "No users found"})
+
+            if ruta in ("/api/users/credit", "/api/users/debit"):
+                monto = float(campos.get("amount", 0))
+                if monto <= 0:
+                    return self._json({"ok": False, "error": "monto inválido"})
+                if ruta.endswith("debit"):
+                    if monto > jugador["balance"]:
+                        return self._json({"ok": False, "error": "saldo insuficiente"})
+                    monto = -monto
+                jugador["balance"] = round(jugador["balance"] + monto, 2)
+                return self._json({"ok": True, "balance": jugador["balance"]})
+
+            if ruta == "/api/users/password":
+                jugador["password"] = campos.get("password", "")
+                return self._json({"ok": True})
+
+            if ruta == "/api/users/unlock":
+                jugador["locked"] = False
+                return self._json({"ok": True})
+
+        self._responder(404, b"{}")
+
+
+class ServidorBlueDayLocal:
+    """
+    Levanta el panel simulado en un hilo. `url` queda lista después de iniciar().
+    """
+
+    def __init__(self, puerto: int = 0, demora: float = 0.0, demora_ui: float = 0.0,
+                 manejador=ManejadorBlueDay):
+        self.estado = EstadoBlueDay()
+        clase = type(
+            "Manejador",
+            (manejador,),
+            {"estado": self.estado, "demora": demora, "demora_ui": demora_ui},
+        )
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), clase)
+        self._servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+def login_http(url: str) -> str:
+    """
+    Cookies de sesión haciendo el login por HTTP (reemplaza al login con
+    Selenium cuando no hay Chrome).
+    """
+    import urllib3
+
+    respuesta = urllib3.PoolManager().request(
+        "POST",
+        url + "/login",
+        fields={"user": USUARIO_ADMIN, "passwd": CONTRASENA_ADMIN},
+        encode_multipart=False,
+        redirect=False,
+    )
+    return respuesta.headers["Set-Cookie"].split(";")[0]
+
+
+def importar_bot():
+    os.environ.setdefault("TELEGRAM_API_ID", "1")
+    os.environ.setdefault("TELEGRAM_API_HASH", "bench")
+    # Que el .session de Telethon no quede en el directorio de trabajo
+    os.environ.setdefault(
+        "TELEGRAM_SESSION", os.path.join(tempfile.gettempdir(), "bench_bot")
+    )
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+    import bot
+
+    return bot
+
+
+def probar_backend_http(demora: float, repeticiones: int):
+    bot = importar_bot()
+    servidor = ServidorBlueDayLocal(demora=demora).iniciar()
+    backend = bot.BackendHTTP(
+        servidor.url, bot.ENDPOINTS_BLUEDAY_HTTP, obtener_cookies=lambda: login_http(servidor.url)
+    )
+
+    pasos = [
+        ("crear_usuario", lambda i: backend.crear_usuario(f"jugador{i}")),
+        ("cargar_fichas", lambda i: backend.cargar_fichas(f"jugador{i}", 1500.0)),
+        ("retirar_fichas", lambda i: backend.retirar_fichas(f"jugador{i}", 500.0)),
+        ("cambiar_contrasena", lambda i: backend.cambiar_contrasena(f"jugador{i}", "nueva123")),
+        ("desbloquear_usuario", lambda i: backend.desbloquear_usuario(f"jugador{i}")),
+    ]
+    for nombre, paso in pasos:
+        inicio = time.perf_counter()
+        resultados = [paso(i) for i in range(repeticiones)]
+        promedio = (time.perf_counter() - inicio) / repeticiones * 1000
+        print(f"{nombre:<22} ok={all(resultados)!s:<5} {promedio:8.2f} ms/op")
+
+    # Sesión vencida: el backend tiene que renovar las cookies y seguir
+    servidor.estado.expirar_sesiones()
+    print(f"{'tras expirar sesión':<22} ok={backend.cargar_fichas('jugador0', 10.0)}")
+    print(f"saldo final jugador0: {backend.saldo('jugador0')}")
+    servidor.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--servir", type=int, metavar="PUERTO", help="solo levantar el servidor")
+    parser.add_argument("--demora", type=float, default=0.0, help="segundos de demora por pedido")
+    parser.add_argument(
+        "--demora-ui", type=float, default=0.0, help="segundos hasta que se abre un modal o menú"
+    )
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.servir is not None:
+        servidor = ServidorBlueDayLocal(args.servir, args.demora, args.demora_ui)
+        print(f"BlueDay local en {servidor.url} (admin/admin)")
+        servidor._servidor.serve_forever()
+    else:
+        probar_backend_http(args.demora, args.repeticiones)
@@ -0,0 +1,252 @@
+"""
+Páginas HTML del panel de BlueDay simulado (ver blueday_local.py).
+
+Usan los mismos IDs y XPaths que las funciones de Selenium del bot:
+#user / #passwd / #dologin en el login; #UserSearch, #UserSearchDiv,
+#NewPlayerButton y los modales de alta y de fichas en el panel; la tabla
+#users y el modal de contraseña en la sección de usuarios.
+"""
+
+ESTILOS = """
+<style>
+  body { font-family: sans-serif; margin: 16px; }
+  .modal { display: none; border: 1px solid #888; padding: 8px; margin: 8px 0; }
+  .fila { display: flex; gap: 8px; margin: 4px 0; }
+  #sidemenu_global_ul { display: none; }
+</style>
+"""
+
+# Contador de pedidos en curso con la misma forma que jQuery.active: el modo
+# rápido del bot espera a que llegue a cero antes de seguir
+SCRIPT_COMUN = """
+<script>
+  window.jQuery = {active: 0};
+  const DEMORA_UI = %(demora_ui)d;
+
+  function pedir(ruta, datos, metodo) {
+    jQuery.active++;
+    const opciones = {method: metodo || "POST", credentials: "same-origin"};
+    const cuerpo = new URLSearchParams(datos);
+    let url = ruta;
+    if (opciones.method === "GET") { url += "?" + cuerpo; } else { opciones.body = cuerpo; }
+    return fetch(url, opciones).then(r => r.json()).finally(() => { jQuery.active--; });
+  }
+  function $id(id) { return document.getElementById(id); }
+  function mostrar(id) { setTimeout(() => { $id(id).style.display = "block"; }, DEMORA_UI); }
+  function ocultar(id) { $id(id).style.display = "none"; }
+  function menu() {
+    const ul = $id("sidemenu_global_ul");
+    setTimeout(() => { ul.style.display = ul.style.display === "block" ? "none" : "block"; }, DEMORA_UI);
+  }
+  // 1500 -> "1.500,00", como lo muestra el panel real
+  function formatear(n) {
+    const [entero, dec] = Number(n).toFixed(2).split(".");
+    return entero.replace(/\\B(?=(\\d{3})+(?!\\d))/g, ".") + "," + dec;
+  }
+  // Acepta "1500.5" (lo que tipea el bot) y "1.500,50"
+  function leerMonto(texto) {
+    texto = texto.trim();
+    if (texto.includes(",")) { texto = texto.replace(/\\./g, "").replace(",", "."); }
+    return parseFloat(texto);
+  }
+</script>
+"""
+
+ENCABEZADO = """
+<header>
+  <nav>
+    <div><a href="#" onclick="menu(); return false;"><i>&#9776;</i></a></div>
+    <div>BlueDay (local)</div>
+  </nav>
+</header>
+<ul id="sidemenu_global_ul">
+  <li><a href="/">Inicio</a></li>
+  <li><a href="/usuarios">Usuarios</a></li>
+</ul>
+"""
+
+LOGIN = """<!DOCTYPE html>
+<html><head><title>Login</title>%(estilos)s</head>
+<body>
+  <form method="POST" action="/login">
+    <input id="user" name="user" placeholder="Usuario">
+    <input id="passwd" name="passwd" type="password" placeholder="Contraseña">
+    <button id="dologin" type="submit">Ingresar</button>
+  </form>
+</body></html>
+"""
+
+PANEL = """<!DOCTYPE html>
+<html><head><title>Panel</title>%(estilos)s%(script)s</head>
+<body>
+%(encabezado)s
+<button id="NewPlayerButton" onclick="mostrar('ModalNewUserPlayer')">Nuevo jugador</button>
+<input id="UserSearch" oninput="buscar()" autocomplete="off" placeholder="Buscar jugador">
+<div id="UserSearchDiv"></div>
+
+<div id="ModalNewUserPlayer" class="modal">
+  <input id="NewUserPlayerUsername" placeholder="Usuario">
+  <input id="NewUserPlayerPassword" type="password" placeholder="Contraseña">
+  <button id="ModalNewUserPlayerSubmit" onclick="crear()">Crear</button>
+  <div id="ModalNewUserPlayerError"></div>
+</div>
+
+<div id="ModalCredit" class="modal">
+  <div id="ModalCreditTitle"></div>
+  <input id="ModalCreditDestinationBalance" readonly>
+  <input id="ModalCreditAmount" oninput="habilitar()" autocomplete="off">
+  <button id="ModalCreditSubmit" onclick="confirmar()" disabled>Confirmar</button>
+  <div id="ModalCreditError"></div>
+</div>
+
+<script>
+  let consulta = 0;
+  let credito = {usuario: null, tipo: null};
+
+  // Búsqueda con demora (debounce): sale recién cuando se deja de tipear y
+  // mientras tanto siguen a la vista los resultados de la búsqueda anterior.
+  let demoraBusqueda = null;
+  function buscar() {
+    clearTimeout(demoraBusqueda);
+    demoraBusqueda = setTimeout(buscarAhora, DEMORA_UI);
+  }
+
+  function buscarAhora() {
+    const n = ++consulta;
+    const nombre = $id("UserSearch").value;
+    if (!nombre) { $id("UserSearchDiv").innerHTML = ""; return; }
+    pedir("/api/users/search", {username: nombre}, "GET").then(d => {
+      if (n !== consulta) { return; }
+      if (!d.users.length) { $id("UserSearchDiv").innerHTML = "<div>No users found</div>"; return; }
+      $id("UserSearchDiv").innerHTML = d.users.map(u =>
+        `<div class="fila"><div>${u.username} ($${formatear(u.balance)})</div>` +
+        `<div><button onclick="abrirCredito('${u.username}', 'credit')">Cargar</button></div>` +
+        `<div><button onclick="abrirCredito('${u.username}', 'debit')">Retirar</button></div></div>`
+      ).join("");
+    });
+  }
+
+  function abrirCredito(usuario, tipo) {
+    credito = {usuario: usuario, tipo: tipo};
+    $id("ModalCreditTitle").textContent = (tipo === "credit" ? "Cargar a " : "Retirar de ") + usuario;
+    $id("ModalCreditAmount").value = "";
+    $id("ModalCreditDestinationBalance").value = "";
+    $id("ModalCreditSubmit").disabled = true;
+    $id("ModalCreditError").textContent = "";
+    mostrar("ModalCredit");
+    pedir("/api/users/search", {username: usuario}, "GET").then(d => {
+      const u = d.users.find(x => x.username === usuario);
+      $id("ModalCreditDestinationBalance").value = formatear(u ? u.balance : 0);
+    });
+  }
+
+  function habilitar() {
+    $id("ModalCreditSubmit").disabled = !(leerMonto($id("ModalCreditAmount").value) > 0);
+  }
+
+  function confirmar() {
+    const monto = leerMonto($id("ModalCreditAmount").value);
+    pedir("/api/users/" + credito.tipo, {username: credito.usuario, amount: monto}).then(d => {
+      if (d.ok) { ocultar("ModalCredit"); buscar(); }
+      else { $id("ModalCreditError").textContent = d.error; }
+    });
+  }
+
+  function crear() {
+    pedir("/api/users/new", {
+      username: $id("NewUserPlayerUsername").value,
+      password: $id("NewUserPlayerPassword").value,
+    }).then(d => {
+      if (d.ok) { ocultar("ModalNewUserPlayer"); }
+      else { $id("ModalNewUserPlayerError").textContent = d.error; }
+    });
+  }
+</script>
+</body></html>
+"""
+
+USUARIOS = """<!DOCTYPE html>
+<html><head><title>Usuarios</title>%(estilos)s%(script)s</head>
+<body>
+%(encabezado)s
+<input id="UserSearch" autocomplete="off" placeholder="Buscar jugador">
+<button id="UserSearchButton" onclick="listar()">Buscar</button>
+<table id="users">
+  <thead><tr><th>Usuario</th><th>Saldo</th><th>Estado</th><th>Acciones</th></tr></thead>
+  <tbody></tbody>
+</table>
+<div id="UsersMessage"></div>
+
+<div id="ModalChangePassword" class="modal">
+  <input id="ChangePasswordNew1" type="password">
+  <input id="ChangePasswordNew2" type="password">
+  <button id="ModalChangePasswordSubmit" onclick="cambiarClave()">Guardar</button>
+  <div id="ModalChangePasswordError"></div>
+</div>
+
+<script>
+  let seleccionado = null;
+
+  function listar() {
+    pedir("/api/users/search", {username: $id("UserSearch").value}, "GET").then(d => {
+      document.querySelector("#users tbody").innerHTML = d.users.map(u =>
+        `<tr><td>${u.username}</td><td>${formatear(u.balance)}</td>` +
+        `<td>${u.locked ? "Bloqueado" : "Activo"}</td><td>` +
+        `<a href="#" onclick="return false;"><i>&#128065;</i></a> ` +
+        `<a href="#" onclick="abrirClave('${u.username}'); return false;"><i>&#128273;</i></a> ` +
+        `<a href="#" onclick="return false;"><i>&#9998;</i></a> ` +
+        `<a href="#" onclick="desbloquear('${u.username}'); return false;"><i>&#128275;</i></a>` +
+        `</td></tr>`
+      ).join("");
+    });
+  }
+
+  function abrirClave(usuario) {
+    seleccionado = usuario;
+    $id("ChangePasswordNew1").value = "";
+    $id("ChangePasswordNew2").value = "";
+    $id("ModalChangePasswordError").textContent = "";
+    mostrar("ModalChangePassword");
+  }
+
+  function cambiarClave() {
+    const clave = $id("ChangePasswordNew1").value;
+    if (clave !== $id("ChangePasswordNew2").value) {
+      $id("ModalChangePasswordError").textContent = "Las contraseñas no coinciden";
+      return;
+    }
+    pedir("/api/users/password", {username: seleccionado, password: clave}).then(d => {
+      if (d.ok) { ocultar("ModalChangePassword"); }
+      else { $id("ModalChangePasswordError").textContent = d.error; }
+    });
+  }
+
+  function desbloquear(usuario) {
+    pedir("/api/users/unlock", {username: usuario}).then(d => {
+      $id("UsersMessage").textContent = d.ok ? usuario + " desbloqueado" : d.error;
+      listar();
+    });
+  }
+</script>
+</body></html>
+"""
+
+
+def _partes(demora_ui_ms: int) -> dict:
+    return {
+        "estilos": ESTILOS,
+        "script": SCRIPT_COMUN % {"demora_ui": demora_ui_ms},
+        "encabezado": ENCABEZADO,
+    }
+
+
+def pagina_login() -> str:
+    return LOGIN % {"estilos": ESTILOS}
+
+
+def pagina_panel(demora_ui_ms: int = 0) -> str:
+    return PANEL % _partes(demora_ui_ms)
+
+
+def pagina_usuarios(demora_ui_ms: int = 0) -> str:
+    return USUARIOS % _partes(demora_ui_ms)
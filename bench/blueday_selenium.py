@@ -0,0 +1,111 @@
+"""
+Benchmark de las funciones de Selenium del bot contra el panel simulado.
+
+Levanta blueday_local.py y, para cada combinación de perfil de Chrome
+(completo / liviano) y modo de interacción (rapido / legacy), mide el
+tiempo de cada operación (login, alta, carga, retiro, cambio de contraseña,
+desbloqueo, carga en tanda) y la memoria del navegador. Necesita Chrome y
+chromedriver (CHROMEDRIVER_PATH).
+
+Uso:
+    python bench/blueday_selenium.py --repeticiones 5
+    python bench/blueday_selenium.py --demora 0.05 --demora-ui 0.2 --modos rapido
+"""
+
+import argparse
+import time
+
+from blueday_local import ServidorBlueDayLocal, importar_bot, USUARIO_ADMIN, CONTRASENA_ADMIN
+from carga_handler import percentil
+from chrome_perfil import rss_arbol_mb
+
+
+def cronometrar(tiempos: dict, nombre: str, funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    tiempos.setdefault(nombre, []).append((time.perf_counter() - inicio, bool(resultado)))
+    return resultado
+
+
+def medir(bot, servidor, perfil: str, modo: str, repeticiones: int):
+    bot.BLUEDAY_MODO_RAPIDO = modo == "rapido"
+    prefijo = f"{perfil[0]}{modo[0]}"
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    driver = bot._crear_driver_chrome(None, perfil)
+    tiempos["arranque"] = [(time.perf_counter() - inicio, True)]
+    try:
+        cronometrar(tiempos, "login", lambda: bot._login_blueday(driver) or True)
+
+        for i in range(repeticiones):
+            nombre = f"{prefijo}{i}"
+            # Igual que el pool: cada operación arranca con el chequeo de sesión
+            for operacion, funcion, args in [
+                ("alta", bot.crear_usuario_en_blueday, (nombre,)),
+                ("carga", bot.cargar_fichas_en_blueday, (nombre, 1500.0)),
+                ("retiro", bot.retirar_fichas_en_blueday, (nombre, 500.0)),
+                ("contraseña", bot.cambiar_contrasena_blueday, (nombre, "nueva123")),
+                ("desbloqueo", bot.desbloquear_usuario_en_blueday, (nombre,)),
+            ]:
+                cronometrar(tiempos, "chequeo sesión", bot.sesion_blueday_valida, driver)
+                if operacion == "desbloqueo":
+                    # Que haya algo que desbloquear: se verifica en el servidor
+                    with servidor.estado.lock:
+                        if nombre in servidor.estado.jugadores:
+                            servidor.estado.jugadores[nombre]["locked"] = True
+                cronometrar(tiempos, operacion, funcion, driver, *args)
+
+        cronometrar(tiempos, "chequeo sesión", bot.sesion_blueday_valida, driver)
+        trabajos = [(f"{prefijo}{i}", 100.0) for i in range(repeticiones)]
+        inicio = time.perf_counter()
+        resultados = bot.cargar_fichas_en_lote(driver, trabajos)
+        por_carga = (time.perf_counter() - inicio) / max(1, len(trabajos))
+        tiempos["carga en tanda"] = [(por_carga, ok) for ok in resultados]
+
+        memoria = rss_arbol_mb(driver.service.process.pid)
+    finally:
+        driver.quit()
+
+    # Saldo esperado por jugador: 1500 - 500 + 100, y desbloqueado en el servidor
+    jugadores = [servidor.estado.jugadores.get(f"{prefijo}{i}", {}) for i in range(repeticiones)]
+    saldos_ok = sum(1 for j in jugadores if j.get("balance") == 1100.0)
+    desbloqueados_ok = sum(1 for j in jugadores if j.get("locked") is False)
+
+    print(f"\n== perfil {perfil}, modo {modo} ==")
+    print(f"{'operación':<16}{'ok':>6}{'media ms':>10}{'p95 ms':>10}")
+    for operacion, valores in tiempos.items():
+        duraciones = [d for d, _ in valores]
+        print(
+            f"{operacion:<16}{sum(ok for _, ok in valores):>3}/{len(valores):<2}"
+            f"{sum(duraciones) / len(duraciones) * 1000:>10.0f}"
+            f"{percentil(duraciones, 95) * 1000:>10.0f}"
+        )
+    print(
+        f"saldos correctos: {saldos_ok}/{repeticiones}   "
+        f"desbloqueados en el servidor: {desbloqueados_ok}/{repeticiones}   "
+        + (f"RSS {memoria:.0f} MB" if memoria is not None else "RSS n/d")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--demora", type=float, default=0.02, help="segundos por pedido al servidor")
+    parser.add_argument("--demora-ui", type=float, default=0.1, help="segundos hasta abrir modales")
+    parser.add_argument("--perfiles", nargs="+", default=["completo", "liviano"])
+    parser.add_argument("--modos", nargs="+", default=["rapido", "legacy"])
+    args = parser.parse_args()
+
+    bot = importar_bot()
+    servidor = ServidorBlueDayLocal(demora=args.demora, demora_ui=args.demora_ui).iniciar()
+    bot.URL_BLUEDAY = servidor.url + "/"
+    bot.usuario_admin = USUARIO_ADMIN
+    bot.contrasena_admin = CONTRASENA_ADMIN
+
+    try:
+        for perfil in args.perfiles:
+            for modo in args.modos:
+                medir(bot, servidor, perfil, modo, args.repeticiones)
+    finally:
+        servidor.detener()
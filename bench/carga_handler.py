@@ -0,0 +1,246 @@
+"""
+Prueba de carga del bot sin Telegram, MySQL ni BlueDay.
+
+Simula jugadores que le escriben al `handler` (y un operador que usa el
+`admin_handler`) con eventos falsos; MySQL y BlueDay se reemplazan por
+falsos con latencia configurable. Informa mensajes por segundo, latencia
+de respuesta p50/p95/p99 y cuánto se trabó el loop de asyncio.
+
+Uso:
+    python bench/carga_handler.py --jugadores 200
+    python bench/carga_handler.py --jugadores 200 --latencia-blueday 2 --duplicados 0.2
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from blueday_local import importar_bot
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+# ------------------------------------------------------------
+# Falsos de Telethon
+# ------------------------------------------------------------
+
+class MensajeFalso:
+    def __init__(self, texto: str):
+        self.text = texto
+
+
+class EventoFalso:
+    """
+    Lo mínimo de events.NewMessage que usan los handlers.
+    """
+
+    def __init__(self, sender_id: int, texto: str):
+        self.sender_id = sender_id
+        self.message = MensajeFalso(texto)
+        self.respuestas = []
+
+    async def respond(self, texto, **kwargs):
+        self.respuestas.append(texto)
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.enviados = 0
+
+    async def send_message(self, destino, texto, **kwargs):
+        self.enviados += 1
+
+
+# ------------------------------------------------------------
+# Falsos de MySQL y BlueDay (bloqueantes, corren en los executors del bot)
+# ------------------------------------------------------------
+
+class MySQLFalso:
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.usuarios = {}
+        self.consultas = 0
+
+    def _esperar(self):
+        self.consultas += 1
+        time.sleep(self.latencia)
+
+    def cargar_usuario(self, telegram_id):
+        self._esperar()
+        return dict(self.usuarios.get(telegram_id, {}))
+
+    def guardar_usuarios(self, lote: dict) -> int:
+        self._esperar()
+        self.usuarios.update({tid: dict(datos) for tid, datos in lote.items()})
+        return len(lote)
+
+    def listar_cuentas(self):
+        self._esperar()
+        return [
+            {
+                "alias": f"claro.pay{i}",
+                "alias_banco": f"alias{i}.mp",
+                "titular": "Titular",
+                "cbu": "0" * 22,
+                "email": f"claro{i}@gmail.com",
+                "activo": 1,
+            }
+            for i in range(5)
+        ]
+
+    def instalar(self, bot):
+        bot.cargar_usuario_desde_mysql = self.cargar_usuario
+        bot.guardar_usuarios_en_mysql = self.guardar_usuarios
+        bot.listar_cuentas = self.listar_cuentas
+
+
+class BlueDayFalso:
+    """
+    Backend de BlueDay que tarda `latencia` segundos (con ±jitter) por operación.
+    """
+
+    def __init__(self, latencia: float, jitter: float = 0.2, fallos: float = 0.0):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.fallos = fallos
+        self.operaciones = 0
+
+    def _operar(self) -> bool:
+        self.operaciones += 1
+        time.sleep(max(0.0, self.latencia * random.uniform(1 - self.jitter, 1 + self.jitter)))
+        return random.random() >= self.fallos
+
+    def crear_usuario(self, nombre_usuario):
+        return self._operar()
+
+    def cargar_fichas(self, nombre_usuario, monto):
+        return self._operar()
+
+    def cargar_fichas_lote(self, trabajos):
+        return [self._operar() for _ in trabajos]
+
+    def retirar_fichas(self, nombre_usuario, monto):
+        return self._operar()
+
+    def cambiar_contrasena(self, nombre_usuario, nueva):
+        return self._operar()
+
+    def desbloquear_usuario(self, nombre_usuario):
+        return self._operar()
+
+
+# ------------------------------------------------------------
+# Medición
+# ------------------------------------------------------------
+
+class MonitorLoop:
+    """
+    Mide cuánto se atrasa el loop: duerme `intervalo` y anota el exceso.
+    """
+
+    def __init__(self, intervalo: float = 0.01, umbral: float = 0.005):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.atrasos = []
+
+    async def correr(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.intervalo)
+            self.atrasos.append(time.perf_counter() - inicio - self.intervalo)
+
+    def resumen(self) -> str:
+        trabas = [a for a in self.atrasos if a > self.umbral]
+        return (
+            f"máx {max(self.atrasos, default=0) * 1000:.1f} ms, "
+            f"{len(trabas)} trabas > {self.umbral * 1000:.0f} ms, "
+            f"total trabado {sum(trabas) * 1000:.1f} ms"
+        )
+
+
+async def jugador(bot, telegram_id: int, pausa: float, duplicados: float, latencias: dict):
+    guion = [("bienvenida", "hola"), ("crear_usuario", f"j{telegram_id}"), ("menu", "menu")]
+
+    for tipo, texto in guion:
+        await asyncio.sleep(random.uniform(0, pausa))
+        envios = 2 if random.random() < duplicados else 1
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *[bot.handler(EventoFalso(telegram_id, texto)) for _ in range(envios)]
+        )
+        latencias.setdefault(tipo, []).append(time.perf_counter() - inicio)
+
+
+async def operador(bot, comandos: int, latencias: dict):
+    for i in range(comandos):
+        await asyncio.sleep(0.05)
+        comando = "listar cuentas" if i % 2 else "estado"
+        inicio = time.perf_counter()
+        await bot.admin_handler(EventoFalso(bot.OPERADOR_ID, comando))
+        latencias.setdefault("admin", []).append(time.perf_counter() - inicio)
+
+
+async def correr(args):
+    bot = importar_bot()
+    random.seed(args.semilla)
+
+    mysql = MySQLFalso(args.latencia_db)
+    mysql.instalar(bot)
+    blueday = BlueDayFalso(args.latencia_blueday, fallos=args.fallos)
+    bot.backend_blueday = blueday
+    bot.executor_blueday = bot.ExecutorBlueDay(args.workers)
+    bot.client = ClienteFalso()
+
+    monitor = MonitorLoop()
+    tarea_monitor = asyncio.create_task(monitor.correr())
+    latencias = {}
+
+    inicio = time.perf_counter()
+    await asyncio.gather(
+        operador(bot, args.comandos_admin, latencias),
+        *[
+            jugador(bot, 100_000 + i, args.pausa, args.duplicados, latencias)
+            for i in range(args.jugadores)
+        ],
+    )
+    duracion = time.perf_counter() - inicio
+    tarea_monitor.cancel()
+
+    mensajes = sum(len(v) for v in latencias.values())
+    print(
+        f"{args.jugadores} jugadores, {mensajes} mensajes en {duracion:.2f} s "
+        f"({mensajes / duracion:.1f} msg/s)"
+    )
+    print(f"{'tipo':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for tipo, valores in latencias.items():
+        print(
+            f"{tipo:<14}{len(valores):>6}"
+            + "".join(f"{percentil(valores, p) * 1000:>10.1f}" for p in (50, 95, 99))
+        )
+    print(f"loop: {monitor.resumen()}")
+    print(
+        f"BlueDay: {blueday.operaciones} operaciones | MySQL: {mysql.consultas} consultas | "
+        f"esperas por turno: {bot.turnos_jugadores.encolados} | "
+        f"reenvíos suprimidos: {bot.reenvios_suprimidos.total():.0f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jugadores", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="hilos del executor de BlueDay")
+    parser.add_argument("--latencia-db", type=float, default=0.005, help="segundos por consulta")
+    parser.add_argument("--latencia-blueday", type=float, default=0.5, help="segundos por operación")
+    parser.add_argument("--fallos", type=float, default=0.0, help="proporción de operaciones que fallan")
+    parser.add_argument("--pausa", type=float, default=1.0, help="pausa máxima entre mensajes (s)")
+    parser.add_argument("--duplicados", type=float, default=0.0, help="proporción de mensajes reenviados")
+    parser.add_argument("--comandos-admin", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=1)
+    asyncio.run(correr(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Compara los perfiles de Chrome del pool de BlueDay (completo / liviano):
+tiempo de arranque del navegador, tiempo hasta tener la página cargada y
+memoria residente (RSS) de chromedriver + todos sus procesos de Chrome.
+
+Uso:
+    python bench/chrome_perfil.py --navegadores 3
+    python bench/chrome_perfil.py --url http://127.0.0.1:8089/ --perfiles liviano
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from blueday_local import importar_bot
+
+
+def _procesos_hijos() -> dict:
+    hijos = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(ppid, []).append(int(pid))
+    return hijos
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def rss_arbol_mb(pid: int):
+    """
+    RSS del proceso y todos sus descendientes, en MB (None fuera de Linux).
+    Las páginas compartidas entre procesos de Chrome se cuentan más de una
+    vez, así que es una cota superior; sirve para comparar perfiles.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    hijos = _procesos_hijos()
+    pendientes, total = [pid], 0
+    while pendientes:
+        actual = pendientes.pop()
+        total += _rss_kb(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return total / 1024
+
+
+def medir(bot, perfil: str, url: str, navegadores: int, datos: str):
+    bot.BLUEDAY_CHROME_DATOS = datos if perfil == "liviano" else ""
+    arranques, cargas, memorias = [], [], []
+
+    for ranura in range(navegadores):
+        inicio = time.perf_counter()
+        driver = bot._crear_driver_chrome(ranura, perfil)
+        arranques.append(time.perf_counter() - inicio)
+
+        try:
+            inicio = time.perf_counter()
+            driver.get(url)
+            cargas.append(time.perf_counter() - inicio)
+
+            memoria = rss_arbol_mb(driver.service.process.pid)
+            if memoria is not None:
+                memorias.append(memoria)
+        finally:
+            driver.quit()
+
+    print(
+        f"{perfil:<10} arranque {statistics.mean(arranques):6.2f} s   "
+        f"carga {statistics.mean(cargas):6.2f} s   "
+        + (f"RSS {statistics.mean(memorias):7.1f} MB/navegador" if memorias else "RSS n/d")
+    )
+
+
+if __name__ == "__main__":
+    bot = importar_bot()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=bot.URL_BLUEDAY)
+    parser.add_argument("--navegadores", type=int, default=3)
+    parser.add_argument("--perfiles", nargs="+", default=["completo", "liviano"])
+    parser.add_argument(
+        "--datos", default=None, help="carpeta de perfiles persistentes (por defecto, temporal)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="blueday-chrome-") as temporal:
+        for perfil in args.perfiles:
+            medir(bot, perfil, args.url, args.navegadores, args.datos or temporal)
@@ -0,0 +1,233 @@
+"""
+Benchmark del flujo de depósito de punta a punta, sin Telegram, MySQL ni BlueDay.
+
+Cada jugador confirma el monto (`iniciar_espera_deposito`, como lo haría
+el handler), hace la transferencia y el mail de Claro Pay llega al
+servidor IMAP local; el lector lo registra en el índice de depósitos y la
+espera del jugador lo reclama y carga las fichas por `AgrupadorCargas`.
+Las sesiones de los jugadores están solo en "MySQL" (no en el cache de
+sesiones) y una parte de los jugadores no tiene usuario de BlueDay: a
+esos no se les tiene que reclamar la transferencia.
+
+Informa cuántos depósitos se acreditaron y si cada carga fue al jugador
+correcto, la latencia desde que llega el mail hasta que BlueDay carga las
+fichas y cómo se agruparon las cargas.
+
+Uso:
+    python bench/depositos.py --jugadores 50
+    python bench/depositos.py --jugadores 200 --cuentas 5 --latencia-blueday 0.5 --ventana 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import threading
+import time
+
+from blueday_local import importar_bot
+from carga_handler import BlueDayFalso, ClienteFalso, MonitorLoop, MySQLFalso, percentil
+from imap_local import UIDVALIDITY, ServidorIMAPLocal, generar_mail
+from ingesta_correo import NotificadorFalso, esperar
+
+
+class TablaMovimientos:
+    """
+    La tabla `movimientos` en memoria: reemplaza insertar_movimientos y
+    reclamar_movimiento_en_mysql, con el mismo filtro de repetidos del bot.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.filas = {}  # message_id -> (monto, cuenta_alias)
+        self.reclamados = 0
+        self._lock = threading.Lock()
+
+    def insertar(self, filas: list) -> list:
+        recientes = self.bot.message_ids_recientes
+        filas = list({f[1]: f for f in filas if f[1] not in recientes}.values())
+        with self._lock:
+            nuevas = [f for f in filas if f[1] not in self.filas]
+            for monto, message_id, alias in nuevas:
+                self.filas[message_id] = (monto, alias)
+        recientes.agregar(f[1] for f in filas)
+        return nuevas
+
+    def reclamar(self, message_id: str) -> bool:
+        with self._lock:
+            if self.filas.pop(message_id, None) is None:
+                return False
+            self.reclamados += 1
+            return True
+
+
+class BlueDayConRegistro(BlueDayFalso):
+    """
+    Anota a quién y cuánto se cargó, y en qué momento.
+    """
+
+    def __init__(self, latencia: float):
+        super().__init__(latencia)
+        self.cargas = []  # (nombre_usuario, monto, momento)
+
+    def cargar_fichas(self, nombre_usuario, monto):
+        exito = super().cargar_fichas(nombre_usuario, monto)
+        self.cargas.append((nombre_usuario, monto, time.perf_counter()))
+        return exito
+
+    def cargar_fichas_lote(self, trabajos):
+        return [self.cargar_fichas(nombre, monto) for nombre, monto in trabajos]
+
+
+async def jugador(bot, servidor, telegram_id: int, cuenta: dict, monto: float, pausa: float, llegadas: dict):
+    await asyncio.sleep(random.uniform(0, pausa))
+
+    # Confirmación del monto: lo que hace el handler en 'confirmar_monto'
+    datos = await bot.sesion_de_jugador(telegram_id) or {}
+    espera = bot.iniciar_espera_deposito(
+        telegram_id, datos.get("usuario_creado"), cuenta["alias"], monto
+    )
+
+    # El jugador hace la transferencia y llega el aviso de Claro Pay
+    await asyncio.sleep(random.uniform(0, pausa))
+    llegadas[telegram_id] = time.perf_counter()
+    servidor.agregar(cuenta["email"], generar_mail("plano", monto, telegram_id))
+    return await espera
+
+
+async def medir(bot, args) -> dict:
+    servidor = ServidorIMAPLocal().iniciar()
+    bot.IMAP_HOST, bot.IMAP_PORT, bot.IMAP_SSL = "127.0.0.1", servidor.puerto, False
+    bot.DEPOSITO_ESPERA_SEGUNDOS = args.timeout
+
+    tabla = TablaMovimientos(bot)
+    bot.insertar_movimientos = tabla.insertar
+    bot.reclamar_movimiento_en_mysql = tabla.reclamar
+
+    mysql = MySQLFalso(args.latencia_db)
+    mysql.instalar(bot)
+    blueday = BlueDayConRegistro(args.latencia_blueday)
+    bot.backend_blueday = blueday
+    bot.executor_blueday = bot.ExecutorBlueDay(args.workers)
+    bot.agrupador_cargas = bot.AgrupadorCargas(args.ventana, args.lote_max)
+    bot.client = ClienteFalso()
+
+    cuentas = [
+        {"alias": f"claro.pay{i}", "email": f"claro{i}@local", "password": "x"}
+        for i in range(args.cuentas)
+    ]
+    # Montos distintos por cuenta, así cada transferencia es de un solo jugador
+    jugadores = {}  # telegram_id -> (cuenta, monto, nombre_usuario o None)
+    for i in range(args.jugadores):
+        telegram_id = 400_000 + i
+        nombre = None if random.random() < args.sin_usuario else f"j{telegram_id}"
+        mysql.usuarios[telegram_id] = (
+            {"usuario_creado": nombre, "estado": "confirmar_monto"} if nombre else {"estado": "inicio"}
+        )
+        jugadores[telegram_id] = (cuentas[i % len(cuentas)], 1000 + i + 0.5, nombre)
+
+    motor = bot.MotorCorreo({}, args.max_logins)
+    motor.iniciar(asyncio.get_running_loop())
+    await motor.sincronizar(cuentas)
+    await esperar(lambda: all(l.estado == "esperando" for l in motor.lectores.values()), 30)
+
+    monitor = MonitorLoop()
+    tarea_monitor = asyncio.create_task(monitor.correr())
+    llegadas = {}
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(
+        *[
+            jugador(bot, servidor, telegram_id, cuenta, monto, args.pausa, llegadas)
+            for telegram_id, (cuenta, monto, _) in jugadores.items()
+        ]
+    )
+    duracion = time.perf_counter() - inicio
+    tarea_monitor.cancel()
+
+    for lector in list(motor.lectores.values()):
+        await lector.detener()
+    servidor.detener()
+    bot.executor_blueday.cerrar()
+
+    esperado = {(nombre, monto): telegram_id for telegram_id, (_, monto, nombre) in jugadores.items() if nombre}
+    latencias, ajenas = [], 0
+    for nombre, monto, momento in blueday.cargas:
+        telegram_id = esperado.get((nombre, monto))
+        if telegram_id is None:
+            ajenas += 1
+        else:
+            latencias.append(momento - llegadas[telegram_id])
+
+    con_usuario = [tid for tid, (_, _, nombre) in jugadores.items() if nombre]
+    sesiones_al_dia = sum(
+        (bot.usuarios.obtener(tid) or {}).get("estado") == "opciones"
+        and mysql.usuarios[tid].get("estado") == "opciones"
+        for tid in con_usuario
+    )
+    return {
+        "duracion": duracion,
+        "con_usuario": len(con_usuario),
+        "sin_usuario": len(jugadores) - len(con_usuario),
+        "acreditados": sum(r is True for r in resultados),
+        "ajenas": ajenas,
+        "sin_reclamar": len(tabla.filas),
+        "sesiones_al_dia": sesiones_al_dia,
+        "latencias": latencias,
+        "tandas": bot.agrupador_cargas.tandas,
+        "agrupadas": bot.agrupador_cargas.agrupadas,
+        "operaciones": blueday.operaciones,
+        "loop": monitor.resumen(),
+    }
+
+
+async def correr(args):
+    bot = importar_bot()
+    random.seed(args.semilla)
+
+    # Sin MySQL: todo el buzón es nuevo y el avance de UIDs no se guarda
+    bot.cargar_estado_imap = lambda alias: (UIDVALIDITY, 0)
+    bot.guardar_estado_imap = lambda alias, uidvalidity, ultimo_uid: None
+    bot.notificador_caja = NotificadorFalso()
+
+    salida = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with salida:
+        r = await medir(bot, args)
+
+    print(
+        f"{args.jugadores} jugadores en {args.cuentas} cuentas, {r['duracion']:.2f} s | "
+        f"acreditados {r['acreditados']}/{r['con_usuario']} | "
+        f"sin usuario: {r['sin_usuario']} (transferencias sin reclamar: {r['sin_reclamar']})"
+    )
+    print(
+        "mail -> fichas cargadas: "
+        + " / ".join(f"p{p} {percentil(r['latencias'], p) * 1000:.0f} ms" for p in (50, 95, 99))
+    )
+    print(
+        f"BlueDay: {r['operaciones']} cargas en {r['tandas']} tandas "
+        f"({r['agrupadas'] / max(1, r['tandas']):.1f} por tanda)"
+    )
+    print(f"sesiones en 'opciones' (memoria y MySQL): {r['sesiones_al_dia']}/{r['con_usuario']}")
+    print(f"loop: {r['loop']}")
+    if r["ajenas"]:
+        print(f"⚠️ {r['ajenas']} cargas a un jugador o monto que no correspondía")
+    if r["sin_reclamar"] != r["sin_usuario"]:
+        print("⚠️ se reclamaron transferencias de jugadores sin usuario (o quedaron otras sin reclamar)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jugadores", type=int, default=50)
+    parser.add_argument("--cuentas", type=int, default=3)
+    parser.add_argument("--sin-usuario", type=float, default=0.1, help="proporción de jugadores sin usuario de BlueDay")
+    parser.add_argument("--workers", type=int, default=4, help="hilos del executor de BlueDay")
+    parser.add_argument("--ventana", type=float, default=0.5, help="ventana del agrupador de cargas (s)")
+    parser.add_argument("--lote-max", type=int, default=10, help="cargas máximas por tanda")
+    parser.add_argument("--latencia-db", type=float, default=0.005, help="segundos por consulta")
+    parser.add_argument("--latencia-blueday", type=float, default=0.2, help="segundos por carga")
+    parser.add_argument("--max-logins", type=int, default=5, help="logins IMAP simultáneos")
+    parser.add_argument("--pausa", type=float, default=2.0, help="pausa máxima entre pasos del jugador (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="espera máxima del depósito (s)")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="mostrar los prints del bot")
+    asyncio.run(correr(parser.parse_args()))
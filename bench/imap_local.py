@@ -0,0 +1,325 @@
+"""
+Servidor IMAP local (sin TLS) para probar los lectores de correo del bot.
+
+Implementa lo que usa ClienteIMAPAsync: LOGIN, CAPABILITY, SELECT, NOOP,
+IDLE (con aviso inmediato de mails nuevos), UID SEARCH, UID FETCH
+(BODYSTRUCTURE y BODY.PEEK[...]) y LOGOUT. Cada usuario tiene su buzón en
+memoria. También genera mails de Claro Pay de distintos tipos: texto plano,
+multipart, solo HTML y malformados.
+
+Uso:
+    python bench/imap_local.py --puerto 1143 --cuentas 3 --mails 10
+"""
+
+import argparse
+import asyncio
+import email
+import random
+import re
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+UIDVALIDITY = 77
+
+TIPOS_MAIL = ("plano", "multipart", "html", "malformado")
+
+
+# ------------------------------------------------------------
+# Mails de prueba
+# ------------------------------------------------------------
+
+def formatear_monto(monto: float) -> str:
+    """
+    1234.5 -> "1.234,50", como lo escribe Claro Pay.
+    """
+    entero, decimales = f"{monto:.2f}".split(".")
+    return f"{int(entero):,}".replace(",", ".") + "," + decimales
+
+
+def _encabezados(mensaje, numero: int, con_message_id: bool = True):
+    mensaje["From"] = "Claro Pay <notificaciones@claropay.com.ar>"
+    mensaje["Subject"] = "Recibiste una transferencia"
+    if con_message_id:
+        mensaje["Message-ID"] = f"<bench-{numero}-{random.getrandbits(48):x}@claropay.local>"
+    return mensaje
+
+
+def generar_mail(tipo: str, monto: float, numero: int) -> bytes:
+    """
+    Mail de aviso de transferencia. Los "malformado" no deberían generar
+    movimientos. Los "html" sí: de un mail que no es multipart el bot lee el
+    cuerpo entero (como antes con msg.walk()); la parte text/plain se elige
+    solo dentro de los multipart.
+    """
+    texto = f"¡Hola! Te acreditamos una transferencia.\nacreditados $ {formatear_monto(monto)}\n"
+
+    if tipo == "plano":
+        mensaje = MIMEText(texto, "plain", "utf-8")
+    elif tipo == "multipart":
+        mensaje = MIMEMultipart("alternative")
+        mensaje.attach(MIMEText(texto, "plain", "utf-8"))
+        mensaje.attach(MIMEText(f"<p>{texto}</p>", "html", "utf-8"))
+    elif tipo == "html":
+        mensaje = MIMEText(f"<html><body><b>{texto}</b></body></html>", "html", "utf-8")
+    else:
+        # Variantes rotas: sin Message-ID, sin monto o con base64 inválido
+        variante = numero % 3
+        if variante == 0:
+            return bytes(_encabezados(MIMEText(texto, "plain", "utf-8"), numero, False))
+        if variante == 1:
+            return bytes(_encabezados(MIMEText("Tu resumen está listo.", "plain", "utf-8"), numero))
+        mensaje = MIMEText("", "plain", "utf-8")
+        mensaje.set_payload("@@@ esto no es base64 @@@")
+        del mensaje["Content-Transfer-Encoding"]
+        mensaje["Content-Transfer-Encoding"] = "base64"
+
+    return bytes(_encabezados(mensaje, numero))
+
+
+def generar_mezcla(cantidad: int, proporciones=(0.5, 0.3, 0.1, 0.1), inicio: int = 0) -> list:
+    """
+    [(tipo, monto, bytes)] con los tipos repartidos según las proporciones.
+    """
+    mails = []
+    for i in range(cantidad):
+        tipo = random.choices(TIPOS_MAIL, proporciones)[0]
+        monto = round(random.uniform(500, 50000), 2)
+        mails.append((tipo, monto, generar_mail(tipo, monto, inicio + i)))
+    return mails
+
+
+# ------------------------------------------------------------
+# Respuestas IMAP
+# ------------------------------------------------------------
+
+def _citar(valor) -> str:
+    if valor is None:
+        return "NIL"
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def bodystructure(mensaje) -> str:
+    if mensaje.is_multipart():
+        hijos = "".join(bodystructure(p) for p in mensaje.get_payload())
+        return f"({hijos} {_citar(mensaje.get_content_subtype().upper())})"
+
+    cuerpo = mensaje.get_payload(decode=False) or ""
+    charset = mensaje.get_content_charset()
+    parametros = f'("CHARSET" {_citar(charset)})' if charset else "NIL"
+    encoding = mensaje.get("Content-Transfer-Encoding", "7BIT").upper()
+    return (
+        f"({_citar(mensaje.get_content_maintype().upper())} "
+        f"{_citar(mensaje.get_content_subtype().upper())} {parametros} NIL NIL "
+        f"{_citar(encoding)} {len(cuerpo)} {cuerpo.count(chr(10)) + 1})"
+    )
+
+
+def seccion(mensaje, nombre: str) -> bytes:
+    if nombre.upper().startswith("HEADER.FIELDS"):
+        campos = {c.upper() for c in re.findall(r"[\w-]+", nombre[len("HEADER.FIELDS"):])}
+        lineas = "".join(f"{k}: {v}\r\n" for k, v in mensaje.items() if k.upper() in campos)
+        return (lineas + "\r\n").encode()
+
+    parte = mensaje
+    for numero in nombre.split("."):
+        if parte.is_multipart():
+            parte = parte.get_payload()[int(numero) - 1]
+    cuerpo = parte.get_payload(decode=False)
+    return cuerpo.encode() if isinstance(cuerpo, str) else b""
+
+
+class Buzon:
+    def __init__(self):
+        self.mensajes = []  # [(uid, bytes)]
+        self.llegadas = {}  # uid -> epoch (INTERNALDATE)
+        self.uidnext = 1
+        self.oyentes = set()
+
+    def agregar(self, crudo: bytes, llegada: float = None) -> int:
+        uid = self.uidnext
+        self.mensajes.append((uid, crudo))
+        self.llegadas[uid] = time.time() if llegada is None else llegada
+        self.uidnext += 1
+        for evento in self.oyentes:
+            evento.set()
+        return uid
+
+
+class ServidorIMAPLocal:
+    """
+    Servidor IMAP en su propio hilo y loop, así la carga del servidor no se
+    mezcla con la del loop del bot. `agregar()` es thread-safe.
+    """
+
+    def __init__(self, puerto: int = 0, con_idle: bool = True, demora: float = 0.0):
+        self.puerto = puerto
+        self.con_idle = con_idle
+        self.demora = demora
+        self.buzones = {}
+        self.conexiones = 0
+        self.loop = None
+        self._servidor = None
+        self._listo = threading.Event()
+
+    def buzon(self, usuario: str) -> Buzon:
+        return self.buzones.setdefault(usuario, Buzon())
+
+    def iniciar(self):
+        threading.Thread(target=self._correr, daemon=True).start()
+        self._listo.wait()
+        return self
+
+    def _correr(self):
+        self.loop = asyncio.new_event_loop()
+        self._servidor = self.loop.run_until_complete(
+            asyncio.start_server(self.atender, "127.0.0.1", self.puerto)
+        )
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        self._listo.set()
+        self.loop.run_forever()
+
+    def detener(self):
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(self._cerrar(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _cerrar(self):
+        self._servidor.close()
+        tareas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    def agregar(self, usuario: str, crudo: bytes, llegada: float = None):
+        """
+        Entrega un mail al buzón (despierta a los clientes en IDLE).
+        'llegada' (epoch) permite sembrar mails viejos.
+        """
+        if self.loop is None:
+            self.buzon(usuario).agregar(crudo, llegada)
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.buzon(usuario).agregar(crudo, llegada))
+
+    async def atender(self, reader, writer):
+        self.conexiones += 1
+        escribir = writer.write
+        escribir(b"* OK IMAP local listo\r\n")
+        usuario = None
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    return
+                if self.demora:
+                    await asyncio.sleep(self.demora)
+
+                partes = linea.decode().strip().split(" ", 2)
+                tag, comando = partes[0], partes[1].upper()
+                resto = partes[2] if len(partes) > 2 else ""
+
+                if comando == "LOGIN":
+                    usuario = re.findall(r'"((?:[^"\\]|\\.)*)"', resto)[0]
+                    escribir(f"{tag} OK LOGIN completado\r\n".encode())
+                elif comando == "CAPABILITY":
+                    capacidades = "IMAP4rev1 IDLE" if self.con_idle else "IMAP4rev1"
+                    escribir(f"* CAPABILITY {capacidades}\r\n{tag} OK\r\n".encode())
+                elif comando == "SELECT":
+                    buzon = self.buzon(usuario)
+                    escribir(
+                        f"* {len(buzon.mensajes)} EXISTS\r\n"
+                        f"* OK [UIDVALIDITY {UIDVALIDITY}] UIDs válidos\r\n"
+                        f"* OK [UIDNEXT {buzon.uidnext}] próximo UID\r\n"
+                        f"{tag} OK [READ-WRITE] SELECT completado\r\n".encode()
+                    )
+                elif comando == "NOOP":
+                    escribir(f"* {len(self.buzon(usuario).mensajes)} EXISTS\r\n{tag} OK\r\n".encode())
+                elif comando == "LOGOUT":
+                    escribir(f"* BYE\r\n{tag} OK\r\n".encode())
+                    await writer.drain()
+                    return
+                elif comando == "IDLE" and self.con_idle:
+                    await self._idle(tag, usuario, reader, writer)
+                elif comando == "UID":
+                    self._uid(tag, usuario, resto, escribir)
+                else:
+                    escribir(f"{tag} BAD comando desconocido\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.conexiones -= 1
+            writer.close()
+
+    async def _idle(self, tag, usuario, reader, writer):
+        buzon = self.buzon(usuario)
+        evento = asyncio.Event()
+        buzon.oyentes.add(evento)
+        writer.write(b"+ idling\r\n")
+        await writer.drain()
+
+        fin = asyncio.ensure_future(reader.readline())  # el DONE del cliente
+        try:
+            while True:
+                aviso = asyncio.ensure_future(evento.wait())
+                listos, _ = await asyncio.wait({fin, aviso}, return_when=asyncio.FIRST_COMPLETED)
+                if aviso in listos:
+                    evento.clear()
+                    writer.write(f"* {len(buzon.mensajes)} EXISTS\r\n".encode())
+                    await writer.drain()
+                else:
+                    aviso.cancel()
+                if fin in listos:
+                    break
+        finally:
+            buzon.oyentes.discard(evento)
+        writer.write(f"{tag} OK IDLE terminado\r\n".encode())
+
+    def _uid(self, tag, usuario, resto, escribir):
+        subcomando, argumentos = resto.split(" ", 1)
+        buzon = self.buzon(usuario)
+
+        if subcomando.upper() == "SEARCH":
+            desde = int(re.search(r"UID (\d+):\*", argumentos).group(1))
+            uids = [u for u, _ in buzon.mensajes if u >= desde]
+            # Como los servidores reales, "n:*" incluye siempre el último
+            if not uids and buzon.mensajes:
+                uids = [buzon.mensajes[-1][0]]
+            escribir(("* SEARCH " + " ".join(map(str, uids)) + f"\r\n{tag} OK\r\n").encode())
+            return
+
+        conjunto, pedido = argumentos.split(" ", 1)
+        uids = {int(u) for u in conjunto.split(",")}
+        for numero, (uid, crudo) in enumerate(buzon.mensajes, 1):
+            if uid not in uids:
+                continue
+            mensaje = email.message_from_bytes(crudo)
+            salida = f"* {numero} FETCH (UID {uid}".encode()
+            if "INTERNALDATE" in pedido:
+                fecha = time.strftime("%d-%b-%Y %H:%M:%S +0000", time.gmtime(buzon.llegadas[uid]))
+                salida += f' INTERNALDATE "{fecha}"'.encode()
+            if "BODYSTRUCTURE" in pedido:
+                salida += b" BODYSTRUCTURE " + bodystructure(mensaje).encode()
+            for nombre in re.findall(r"BODY\.PEEK\[([^\]]*)\]", pedido):
+                datos = seccion(mensaje, nombre)
+                salida += f" BODY[{nombre}] {{{len(datos)}}}\r\n".encode() + datos
+            escribir(salida + b")\r\n")
+        escribir(f"{tag} OK UID FETCH completado\r\n".encode())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--puerto", type=int, default=1143)
+    parser.add_argument("--cuentas", type=int, default=3)
+    parser.add_argument("--mails", type=int, default=10, help="mails iniciales por cuenta")
+    parser.add_argument("--sin-idle", action="store_true", help="no anunciar IDLE (fuerza NOOP)")
+    args = parser.parse_args()
+
+    servidor = ServidorIMAPLocal(args.puerto, con_idle=not args.sin_idle)
+    for i in range(args.cuentas):
+        for _, _, crudo in generar_mezcla(args.mails, inicio=i * args.mails):
+            servidor.agregar(f"claro{i}@local", crudo)
+    servidor.iniciar()
+    print(f"IMAP local en 127.0.0.1:{servidor.puerto} (usuarios claro0@local ... cualquier clave)")
+    threading.Event().wait()
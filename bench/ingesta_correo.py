@@ -0,0 +1,230 @@
+"""
+Benchmark de la lectura de correos (MotorCorreo + LectorCuenta) contra el
+servidor IMAP local, sin Gmail ni MySQL.
+
+Para cada cantidad de cuentas: siembra un atraso de mails por cuenta
+(mezcla de texto plano, multipart, solo HTML y malformados), mide cuánto
+tarda el motor en vaciarlo (mails/s) y después entrega mails "en vivo" para
+medir la latencia desde que llegan al buzón hasta que se inserta la fila
+en `movimientos`. También informa memoria, CPU del loop, descriptores,
+hilos y tareas, y cuántos mails de cada tipo terminaron registrados.
+
+Uso:
+    python bench/ingesta_correo.py --cuentas 1 10 50 100
+    python bench/ingesta_correo.py --cuentas 20 --atraso 200 --vivos 20 --demora 0.005
+"""
+
+import argparse
+import asyncio
+import contextlib
+import email
+import io
+import os
+import random
+import threading
+import time
+
+from blueday_local import importar_bot
+from carga_handler import MonitorLoop, percentil
+from chrome_perfil import _rss_kb
+from imap_local import TIPOS_MAIL, UIDVALIDITY, ServidorIMAPLocal, generar_mail, generar_mezcla
+
+
+class MovimientosFalsos:
+    """
+    Reemplaza insertar_movimientos: anota el momento en que se "inserta"
+    cada message_id y respeta el filtro de repetidos del bot.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.insertados = {}
+        self._lock = threading.Lock()
+
+    def insertar(self, filas: list) -> list:
+        recientes = self.bot.message_ids_recientes
+        filas = list({f[1]: f for f in filas if f[1] not in recientes}.values())
+        ahora = time.perf_counter()
+        with self._lock:
+            nuevas = [f for f in filas if f[1] not in self.insertados]
+            for fila in nuevas:
+                self.insertados[fila[1]] = ahora
+        recientes.agregar(f[1] for f in filas)
+        return nuevas
+
+
+class NotificadorFalso:
+    def __init__(self):
+        self.avisos = 0
+
+    def avisar(self, mensaje: str):
+        self.avisos += 1
+
+
+def _message_id(crudo: bytes):
+    return email.message_from_bytes(crudo).get("Message-ID")
+
+
+def recursos() -> dict:
+    return {
+        "rss": _rss_kb(os.getpid()) / 1024,
+        "fds": len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0,
+        "hilos": threading.active_count(),
+        "tareas": len(asyncio.all_tasks()),
+    }
+
+
+async def esperar(condicion, timeout: float) -> bool:
+    limite = time.perf_counter() + timeout
+    while not condicion():
+        if time.perf_counter() > limite:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def medir(bot, cantidad: int, args) -> dict:
+    servidor = ServidorIMAPLocal(con_idle=not args.sin_idle, demora=args.demora)
+    bot.IMAP_HOST, bot.IMAP_PORT, bot.IMAP_SSL = "127.0.0.1", 0, False
+    bot.message_ids_recientes = bot.IndiceRecientes(bot.MAX_MESSAGE_IDS_RECIENTES)
+    movimientos = MovimientosFalsos(bot)
+    bot.insertar_movimientos = movimientos.insertar
+
+    cuentas = [
+        {"alias": f"claro.pay{i}", "email": f"claro{i}@local", "password": "x"}
+        for i in range(cantidad)
+    ]
+    tipos = {}  # message_id -> tipo
+    total_atraso = 0
+    for i, cuenta in enumerate(cuentas):
+        for tipo, _, crudo in generar_mezcla(args.atraso, inicio=i * args.atraso):
+            servidor.agregar(cuenta["email"], crudo)
+            tipos[_message_id(crudo)] = tipo
+            total_atraso += 1
+    servidor.iniciar()
+    bot.IMAP_PORT = servidor.puerto
+
+    monitor = MonitorLoop()
+    tarea_monitor = asyncio.create_task(monitor.correr())
+    motor = bot.MotorCorreo({}, args.max_logins)
+    motor.iniciar(asyncio.get_running_loop())
+
+    # Atraso: desde que arrancan los lectores hasta que todos quedan esperando
+    cpu_inicio = time.thread_time()
+    inicio = time.perf_counter()
+    await motor.sincronizar(cuentas)
+    al_dia = await esperar(
+        lambda: sum(l.procesados for l in motor.lectores.values()) >= total_atraso
+        and all(l.estado == "esperando" for l in motor.lectores.values()),
+        args.timeout,
+    )
+    drenado = time.perf_counter() - inicio
+    cpu_drenado = time.thread_time() - cpu_inicio
+    insertados_atraso = len(movimientos.insertados)
+
+    # En vivo: mails válidos repartidos al azar entre las cuentas
+    llegadas = {}
+    cpu_inicio = time.thread_time()
+    for n in range(args.vivos * cantidad):
+        cuenta = random.choice(cuentas)
+        crudo = generar_mail("plano", round(random.uniform(500, 50000), 2), 10**7 + n)
+        message_id = _message_id(crudo)
+        tipos[message_id] = "plano"
+        llegadas[message_id] = time.perf_counter()
+        servidor.agregar(cuenta["email"], crudo)
+        await asyncio.sleep(random.expovariate(args.ritmo))
+    await esperar(lambda: all(m in movimientos.insertados for m in llegadas), args.timeout)
+    cpu_vivo = time.thread_time() - cpu_inicio
+
+    uso = recursos()
+    tarea_monitor.cancel()
+    for lector in list(motor.lectores.values()):
+        await lector.detener()
+    servidor.detener()
+
+    latencias = [
+        movimientos.insertados[m] - llegada
+        for m, llegada in llegadas.items()
+        if m in movimientos.insertados
+    ]
+    por_tipo = {tipo: [0, 0] for tipo in TIPOS_MAIL}
+    for message_id, tipo in tipos.items():
+        por_tipo[tipo][0] += 1
+        por_tipo[tipo][1] += message_id in movimientos.insertados
+
+    return {
+        "cuentas": cantidad,
+        "al_dia": al_dia,
+        "atraso": total_atraso,
+        "drenado": drenado,
+        "insertados_atraso": insertados_atraso,
+        "cpu_drenado": cpu_drenado,
+        "vivos": len(llegadas),
+        "latencias": latencias,
+        "cpu_vivo": cpu_vivo,
+        "por_tipo": por_tipo,
+        "loop": monitor.resumen(),
+        **uso,
+    }
+
+
+def informar(resultados: list):
+    print(
+        f"\n{'cuentas':>7}{'mails':>7}{'mails/s':>9}{'filas/s':>9}{'cpu s':>7}{'cpu vivo':>9}"
+        f"{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'RSS MB':>8}{'fds':>6}{'hilos':>6}{'tareas':>7}"
+    )
+    for r in resultados:
+        print(
+            f"{r['cuentas']:>7}{r['atraso']:>7}"
+            f"{r['atraso'] / r['drenado']:>9.0f}{r['insertados_atraso'] / r['drenado']:>9.0f}"
+            f"{r['cpu_drenado']:>7.2f}{r['cpu_vivo']:>9.2f}"
+            + "".join(f"{percentil(r['latencias'], p) * 1000:>8.1f}" for p in (50, 95, 99))
+            + f"{r['rss']:>8.1f}{r['fds']:>6}{r['hilos']:>6}{r['tareas']:>7}"
+        )
+        if not r["al_dia"]:
+            print(f"        ⚠️ el atraso no se terminó de leer dentro del timeout")
+        if len(r["latencias"]) < r["vivos"]:
+            print(f"        ⚠️ {r['vivos'] - len(r['latencias'])} mails en vivo sin registrar")
+
+    print("\nloop de asyncio por corrida:")
+    for r in resultados:
+        print(f"{r['cuentas']:>7} cuentas: {r['loop']}")
+
+    print("\nmails registrados en movimientos, por tipo (todas las corridas):")
+    for tipo in TIPOS_MAIL:
+        enviados = sum(r["por_tipo"][tipo][0] for r in resultados)
+        registrados = sum(r["por_tipo"][tipo][1] for r in resultados)
+        print(f"  {tipo:<11}{registrados:>7}/{enviados}")
+
+
+async def correr(args):
+    bot = importar_bot()
+    random.seed(args.semilla)
+
+    # Sin MySQL: todo el buzón es nuevo y el avance de UIDs no se guarda
+    bot.cargar_estado_imap = lambda alias: (UIDVALIDITY, 0)
+    bot.guardar_estado_imap = lambda alias, uidvalidity, ultimo_uid: None
+    bot.notificador_caja = NotificadorFalso()
+
+    resultados = []
+    for cantidad in args.cuentas:
+        salida = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with salida:
+            resultados.append(await medir(bot, cantidad, args))
+        print(f"✔ {cantidad} cuentas")
+    informar(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cuentas", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--atraso", type=int, default=50, help="mails sembrados por cuenta")
+    parser.add_argument("--vivos", type=int, default=5, help="mails en vivo por cuenta")
+    parser.add_argument("--ritmo", type=float, default=50.0, help="mails en vivo por segundo (promedio)")
+    parser.add_argument("--demora", type=float, default=0.0, help="segundos por comando IMAP")
+    parser.add_argument("--max-logins", type=int, default=5, help="logins IMAP simultáneos")
+    parser.add_argument("--sin-idle", action="store_true", help="el servidor no anuncia IDLE (NOOP)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="mostrar los prints del bot")
+    asyncio.run(correr(parser.parse_args()))
@@ -3,15 +3,26 @@ import random
 import string
 import unicodedata
 import time
-import imaplib
 import email
+import base64
+import quopri
 import re
 import threading
 import asyncio
+import ssl
+import json
 import traceback
-from queue import Queue
-
-from telethon import TelegramClient, events
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Empty
+from urllib.parse import urlencode
+
+from telethon import TelegramClient, errors, events
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -20,8 +31,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import StaleElementReferenceException
 
 import mysql.connector
+import urllib3
 
 
 # ============================================================
@@ -33,8 +46,8 @@ api_id = int(os.getenv("TELEGRAM_API_ID", "0"))
 api_hash = os.getenv("TELEGRAM_API_HASH", "")
 phone_number = os.getenv("TELEGRAM_PHONE", "")
 
-# Sesión local
-client = TelegramClient("session_name", api_id, api_hash)
+# Sesión local (archivo .session de Telethon)
+client = TelegramClient(os.getenv("TELEGRAM_SESSION", "session_name"), api_id, api_hash)
 
 # Credenciales para BlueDay / ClubUno
 usuario_admin = os.getenv("BLUEDAY_USER", "")
@@ -54,22 +67,386 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME", "claro_pay"),
 }
 
+# Pool de conexiones MySQL: tope de conexiones abiertas y segundos antes de reciclarlas
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+# Lectura de correos: servidor IMAP, renovación del IDLE (< 29 min, RFC 2177),
+# cada cuántos segundos se hace NOOP si el servidor no soporta IDLE,
+# timeout por comando y cuántas cuentas pueden estar logueándose a la vez
+IMAP_HOST = os.getenv("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_SSL = os.getenv("IMAP_SSL", "1") == "1"
+IMAP_IDLE_SEGUNDOS = int(os.getenv("IMAP_IDLE_SEGUNDOS", "1500"))
+IMAP_NOOP_SEGUNDOS = float(os.getenv("IMAP_NOOP_SEGUNDOS", "2"))
+IMAP_TIMEOUT = float(os.getenv("IMAP_TIMEOUT", "60"))
+IMAP_MAX_LOGINS = int(os.getenv("IMAP_MAX_LOGINS", "5"))
+
 # Ruta al ChromeDriver (modificar según tu sistema)
 CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", r"C:\ruta\a\chromedriver.exe")
 
-# Cola para mensajes a enviar (por ejemplo, al grupo de caja)
-cola_mensajes: "Queue[str]" = Queue()
+# Panel de administración
+URL_BLUEDAY = os.getenv("BLUEDAY_URL", "https://admin.clubuno.net")
+
+# Interacción con BlueDay: "rapido" espera condiciones concretas (modal visible,
+# pedidos AJAX terminados, valor cargado); "legacy" usa las pausas fijas de siempre
+BLUEDAY_MODO = os.getenv("BLUEDAY_MODO", "rapido").lower()
+BLUEDAY_MODO_RAPIDO = BLUEDAY_MODO != "legacy"
+
+# Cómo se opera en BlueDay: "selenium" (navegador) o "http" (endpoints del panel,
+# reutilizando las cookies de un login con Selenium)
+BLUEDAY_BACKEND = os.getenv("BLUEDAY_BACKEND", "selenium").lower()
+
+# Endpoints del panel para el backend HTTP (JSON operación -> ruta). Los valores
+# por defecto son los del servidor de prueba de bench/; ajustarlos a los reales.
+ENDPOINTS_BLUEDAY_HTTP = {
+    "buscar_usuario": "/api/users/search",
+    "crear_usuario": "/api/users/new",
+    "cargar_fichas": "/api/users/credit",
+    "retirar_fichas": "/api/users/debit",
+    "cambiar_contrasena": "/api/users/password",
+    "desbloquear_usuario": "/api/users/unlock",
+}
+ENDPOINTS_BLUEDAY_HTTP.update(json.loads(os.getenv("BLUEDAY_HTTP_ENDPOINTS", "{}")))
+BLUEDAY_HTTP_TIMEOUT = float(os.getenv("BLUEDAY_HTTP_TIMEOUT", "15"))
+
+# Perfil de Chrome: "completo" (ventana normal) o "liviano" (headless, sin imágenes,
+# fuentes ni multimedia, carga "eager" y carpeta de datos propia por navegador)
+BLUEDAY_CHROME_PERFIL = os.getenv("BLUEDAY_CHROME_PERFIL", "completo").lower()
+# Carpeta base de los perfiles persistentes (cache y cookies sobreviven reinicios)
+BLUEDAY_CHROME_DATOS = os.getenv("BLUEDAY_CHROME_DATOS", "")
+
+# Cargas de fichas que llegan juntas se hacen seguidas en un mismo navegador:
+# ventana para juntarlas (0 = sin agrupar) y máximo por tanda
+BLUEDAY_LOTE_VENTANA = float(os.getenv("BLUEDAY_LOTE_VENTANA", "0.5"))
+BLUEDAY_LOTE_MAX = int(os.getenv("BLUEDAY_LOTE_MAX", "10"))
+
+# Memoria aproximada que ocupa cada Chrome logueado (MB)
+BLUEDAY_MB_POR_NAVEGADOR = int(os.getenv("BLUEDAY_MB_POR_NAVEGADOR", "350"))
+
+
+def _workers_blueday_por_defecto() -> int:
+    """
+    Cada worker maneja un Chrome: se limita por núcleos y por la mitad de la
+    memoria física, lo que sea menor.
+    """
+    nucleos = os.cpu_count() or 1
+    try:
+        memoria = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        por_memoria = int(memoria / 2 // (BLUEDAY_MB_POR_NAVEGADOR * 1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        por_memoria = nucleos
+    return max(1, min(nucleos, por_memoria))
+
 
-# Diccionario en memoria para usuarios (además de MySQL)
-usuarios = {}
+# Hilos que ejecutan trabajos de Selenium (0 = calcular según núcleos y memoria)
+BLUEDAY_WORKERS = int(os.getenv("BLUEDAY_WORKERS", "0")) or _workers_blueday_por_defecto()
+
+# Navegadores logueados que se mantienen abiertos (por defecto, uno por worker;
+# con el backend HTTP alcanza con uno para sacar las cookies)
+BLUEDAY_POOL_SIZE = int(os.getenv("BLUEDAY_POOL_SIZE", "0")) or (
+    1 if BLUEDAY_BACKEND == "http" else BLUEDAY_WORKERS
+)
+
+# Rotación de cuentas Claro Pay: round_robin | ponderada | lru,
+# cada cuántas asignaciones se guarda el cursor y vigencia de la lista en memoria
+ROTACION_ESTRATEGIA = os.getenv("ROTACION_ESTRATEGIA", "round_robin")
+ROTACION_PERSISTIR_CADA = int(os.getenv("ROTACION_PERSISTIR_CADA", "10"))
+ROTACION_CACHE_SEGUNDOS = int(os.getenv("ROTACION_CACHE_SEGUNDOS", "300"))
+
+# Vigencia de un ingreso detectado (segundos) y filas que borra cada DELETE del vencimiento
+MOVIMIENTOS_TTL_SEGUNDOS = int(os.getenv("MOVIMIENTOS_TTL_SEGUNDOS", "600"))
+MOVIMIENTOS_BORRADO_LOTE = int(os.getenv("MOVIMIENTOS_BORRADO_LOTE", "500"))
+
+# Cuánto se espera la transferencia de un jugador que confirmó un monto (segundos)
+DEPOSITO_ESPERA_SEGUNDOS = int(os.getenv("DEPOSITO_ESPERA_SEGUNDOS", "900"))
+
+# Avisos al grupo de caja: ventana para juntar varios ingresos en un solo mensaje
+CAJA_VENTANA_SEGUNDOS = float(os.getenv("CAJA_VENTANA_SEGUNDOS", "1.5"))
+CAJA_MAX_POR_MENSAJE = int(os.getenv("CAJA_MAX_POR_MENSAJE", "20"))
+
+# Sesiones de usuarios en memoria (además de MySQL): máximo y segundos de inactividad
+SESIONES_MAX = int(os.getenv("SESIONES_MAX", "5000"))
+SESIONES_TTL_SEGUNDOS = int(os.getenv("SESIONES_TTL_SEGUNDOS", "3600"))
+
+# Cada cuántos segundos se vuelcan a MySQL los cambios de estado de los usuarios
+USUARIOS_VOLCADO_SEGUNDOS = float(os.getenv("USUARIOS_VOLCADO_SEGUNDOS", "1"))
+
+# Métricas en formato Prometheus (GET /metrics). Puerto 0 = desactivadas
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9108"))
 
 # Estado global de mantenimiento
 en_mantenimiento = False
 
-# Hilos activos para lectores de Gmail
+# Lectores de Gmail activos (uno por cuenta, todos en el loop del bot)
 hilos_activos = {}
 
 
+# ============================================================
+# MÉTRICAS (formato de texto de Prometheus)
+# ============================================================
+
+# Límites (segundos) de las cubetas de los histogramas de tiempos
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escapar_etiqueta(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: dict) -> tuple:
+        return tuple(str(etiquetas.get(e, "")) for e in self.etiquetas)
+
+    def _formato(self, clave: tuple, extra=()) -> str:
+        pares = list(zip(self.etiquetas, clave)) + list(extra)
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{e}="{_escapar_etiqueta(v)}"' for e, v in pares) + "}"
+
+    def lineas(self) -> list:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores = {}
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._valores.values())
+
+    def lineas(self) -> list:
+        with self._lock:
+            valores = list(self._valores.items())
+        return super().lineas() + [
+            f"{self.nombre}{self._formato(clave)} {valor}" for clave, valor in valores
+        ]
+
+
+class Indicador(_Metrica):
+    """
+    Valor que se calcula al momento de exponer las métricas. 'funcion'
+    devuelve un número o, si hay etiquetas, {(valores de etiquetas): número}.
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, funcion, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def lineas(self) -> list:
+        try:
+            valor = self.funcion()
+        except Exception:
+            return []
+        valores = valor.items() if self.etiquetas else [((), valor)]
+        return super().lineas() + [
+            f"{self.nombre}{self._formato(clave)} {float(v)}" for clave, v in valores
+        ]
+
+
+class Histograma(_Metrica):
+    """
+    Histograma acumulativo por cubetas, como los de Prometheus. Además
+    guarda las últimas observaciones de cada serie para calcular
+    percentiles recientes (p. ej. para el comando de rendimiento).
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), limites=LIMITES_SEGUNDOS,
+                 recientes: int = 200):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+        self.recientes = recientes
+        self._series = {}
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {
+                    "cubetas": [0] * (len(self.limites) + 1),
+                    "suma": 0.0,
+                    "cuenta": 0,
+                    "ultimos": deque(maxlen=self.recientes),
+                }
+            serie["cubetas"][bisect_left(self.limites, valor)] += 1
+            serie["suma"] += valor
+            serie["cuenta"] += 1
+            serie["ultimos"].append(valor)
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """
+        Observa cuánto tarda el bloque (también si termina con excepción).
+        Sirve para código async: el tiempo incluye los await del bloque.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def percentil(self, p: float, **etiquetas):
+        """
+        Percentil p de las observaciones recientes de las series que coinciden
+        con las etiquetas dadas (todas si no se da ninguna); una etiqueta puede
+        pedir varios valores con una tupla. None si no hay datos.
+        """
+        filtro = {
+            self.etiquetas.index(e): {str(x) for x in (v if isinstance(v, tuple) else (v,))}
+            for e, v in etiquetas.items()
+        }
+        with self._lock:
+            valores = sorted(
+                valor
+                for clave, serie in self._series.items()
+                if all(clave[i] in v for i, v in filtro.items())
+                for valor in serie["ultimos"]
+            )
+        if not valores:
+            return None
+        return valores[min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))]
+
+    def lineas(self) -> list:
+        with self._lock:
+            series = [
+                (clave, list(s["cubetas"]), s["suma"], s["cuenta"])
+                for clave, s in self._series.items()
+            ]
+        salida = super().lineas()
+        for clave, cubetas, suma, cuenta in series:
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + ("+Inf",), cubetas):
+                acumulado += cantidad
+                salida.append(
+                    f"{self.nombre}_bucket{self._formato(clave, [('le', limite)])} {acumulado}"
+                )
+            salida.append(f"{self.nombre}_sum{self._formato(clave)} {suma}")
+            salida.append(f"{self.nombre}_count{self._formato(clave)} {cuenta}")
+        return salida
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas=()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas=(), **opciones) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, **opciones))
+
+    def indicador(self, nombre: str, ayuda: str, funcion, etiquetas=()) -> Indicador:
+        return self._registrar(Indicador(nombre, ayuda, funcion, etiquetas))
+
+    def exponer(self) -> str:
+        return "\n".join(l for m in self._metricas for l in m.lineas()) + "\n"
+
+
+metricas = RegistroMetricas()
+
+tiempos_handler = metricas.histograma(
+    "bot_handler_segundos", "Tiempo de atención de un mensaje de Telegram", ("handler",)
+)
+tiempos_mysql = metricas.histograma(
+    "bot_mysql_segundos", "Duración de las llamadas a MySQL desde el loop (con la espera del executor)",
+    ("funcion",),
+)
+espera_blueday = metricas.histograma(
+    "bot_blueday_espera_segundos", "Tiempo en cola del executor de BlueDay", ("operacion",)
+)
+tiempos_blueday = metricas.histograma(
+    "bot_blueday_segundos", "Duración de cada operación del backend de BlueDay", ("operacion",)
+)
+fallos_blueday = metricas.contador(
+    "bot_blueday_fallos_total", "Operaciones de BlueDay que fallaron", ("operacion",)
+)
+tiempos_selenium = metricas.histograma(
+    "bot_selenium_segundos", "Duración de cada función de Selenium (con navegador ya tomado)",
+    ("funcion",),
+)
+tiempos_imap = metricas.histograma(
+    "bot_imap_segundos", "Duración de los comandos IMAP por cuenta", ("comando", "cuenta")
+)
+tiempos_imap_conexion = metricas.histograma(
+    "bot_imap_conexion_segundos", "Conexión, login y SELECT de un lector de correo", ("cuenta",)
+)
+tiempos_caja = metricas.histograma(
+    "bot_caja_envio_segundos", "Duración de cada envío al grupo de caja"
+)
+avisos_caja = metricas.contador(
+    "bot_caja_avisos_total", "Avisos al grupo de caja por resultado", ("resultado",)
+)
+tiempos_operaciones = metricas.histograma(
+    "bot_operacion_segundos", "Duración de punta a punta de las operaciones de los jugadores",
+    ("operacion",),
+)
+reenvios_suprimidos = metricas.contador(
+    "bot_reenvios_suprimidos_total", "Mensajes reenviados que no repitieron la operación en BlueDay",
+    ("operacion",),
+)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        cuerpo = metricas.exponer().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor_metricas(host: str = METRICAS_HOST, puerto: int = METRICAS_PUERTO):
+    """
+    Expone las métricas por HTTP en un hilo aparte. Devuelve el servidor
+    (o None si están desactivadas o no se pudo abrir el puerto).
+    """
+    if not puerto:
+        return None
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    except OSError as e:
+        print(f"⚠️ No se pudo abrir el puerto de métricas {puerto}: {e}")
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    print(f"📈 Métricas en http://{host}:{servidor.server_port}/metrics")
+    return servidor
+
+
 # ============================================================
 # UTILIDADES DB / IMAP
 # ============================================================
@@ -92,23 +469,432 @@ def mysql_connect_safe():
     return None
 
 
-def imap_connect_safe(email_addr: str, password: str):
+class PoolMySQL:
+    """
+    Pool de conexiones MySQL thread-safe, compartido por los hilos lectores
+    y por el executor que atiende al bot.
+    Limita las conexiones abiertas, las reutiliza y recicla las viejas o caídas.
+    """
+
+    # Si una conexión estuvo libre más que esto, se verifica con un ping antes de usarla
+    PING_SI_INACTIVA = 30
+
+    def __init__(self, tamano: int, reciclar: int):
+        self.tamano = max(1, tamano)
+        self.reciclar = reciclar
+        self._libres: "Queue" = Queue()  # (conn, creada_en, devuelta_en)
+        self._creada_en = {}
+        self._creadas = 0
+        self._lock = threading.Lock()
+
+    def _reservar_lugar(self) -> bool:
+        with self._lock:
+            if self._creadas < self.tamano:
+                self._creadas += 1
+                return True
+            return False
+
+    def _nueva(self):
+        conn = mysql_connect_safe()
+        if not conn:
+            with self._lock:
+                self._creadas -= 1
+            return None
+        self._creada_en[id(conn)] = time.monotonic()
+        return conn
+
+    def descartar(self, conn):
+        self._creada_en.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._creadas -= 1
+
+    def _utilizable(self, conn, devuelta_en: float) -> bool:
+        ahora = time.monotonic()
+        if ahora - self._creada_en.get(id(conn), 0) > self.reciclar:
+            return False
+        if ahora - devuelta_en > self.PING_SI_INACTIVA:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _tomar_libre(self, timeout=None):
+        """
+        Devuelve una conexión libre y sana, descartando las vencidas.
+        Con timeout=None no espera.
+        """
+        while True:
+            try:
+                if timeout is None:
+                    conn, devuelta_en = self._libres.get_nowait()
+                else:
+                    conn, devuelta_en = self._libres.get(timeout=timeout)
+            except Empty:
+                return None
+            if self._utilizable(conn, devuelta_en):
+                return conn
+            self.descartar(conn)
+            # Se liberó un lugar: mejor abrir una nueva que seguir esperando
+            if self._reservar_lugar():
+                return self._nueva()
+
+    def obtener(self, timeout: float = 30):
+        conn = self._tomar_libre()
+        if conn:
+            return conn
+
+        if self._reservar_lugar():
+            return self._nueva()
+
+        conn = self._tomar_libre(timeout)
+        if not conn:
+            print("❌ [MySQL] Pool agotado: no hay conexiones libres.")
+        return conn
+
+    def devolver(self, conn):
+        """
+        Vuelve la conexión al pool cerrando la transacción que haya quedado
+        abierta: con autocommit apagado, hasta un SELECT deja fija la foto de
+        REPEATABLE READ y el próximo que la use vería datos viejos.
+        """
+        try:
+            conn.rollback()
+        except Exception:
+            self.descartar(conn)
+            return
+        self._libres.put((conn, time.monotonic()))
+
+
+pool_mysql = PoolMySQL(DB_POOL_SIZE, DB_POOL_RECYCLE)
+
+
+@contextmanager
+def conexion_mysql():
+    """
+    Toma una conexión del pool y la devuelve al salir (con rollback de lo que
+    no se haya confirmado); si ni eso funciona, la conexión se descarta.
+    Entrega None si MySQL no responde (igual que mysql_connect_safe).
+    """
+    conn = pool_mysql.obtener()
+    if conn is None:
+        yield None
+        return
+
+    try:
+        yield conn
+    finally:
+        pool_mysql.devolver(conn)
+
+
+# Executor para usar MySQL desde el loop de Telethon sin bloquearlo
+executor_mysql = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="mysql")
+
+
+async def db_async(funcion, *args):
+    """
+    Ejecuta una función de acceso a datos en el executor de MySQL.
+    Los reintentos y esperas de mysql_connect_safe nunca corren en el loop.
+    """
+    loop = asyncio.get_running_loop()
+    with tiempos_mysql.medir(funcion=getattr(funcion, "__name__", "desconocida")):
+        return await loop.run_in_executor(executor_mysql, funcion, *args)
+
+
+# Tablas auxiliares que el bot crea al arrancar si no existen
+ESQUEMA_AUXILIAR = [
+    """
+    CREATE TABLE IF NOT EXISTS imap_estado (
+        cuenta_alias VARCHAR(100) PRIMARY KEY,
+        uidvalidity BIGINT UNSIGNED NOT NULL,
+        ultimo_uid BIGINT UNSIGNED NOT NULL
+    )
+    """,
+    # Evita movimientos repetidos a nivel base (permite INSERT IGNORE por tanda)
+    "ALTER TABLE movimientos ADD UNIQUE KEY uq_movimientos_message_id (message_id)",
+    # El vencimiento borra por antigüedad: sin índice cada DELETE recorre la tabla
+    "ALTER TABLE movimientos ADD INDEX idx_movimientos_creado_en (creado_en)",
+    # Valores sueltos que el bot necesita recordar entre reinicios
+    """
+    CREATE TABLE IF NOT EXISTS bot_estado (
+        clave VARCHAR(64) PRIMARY KEY,
+        valor VARCHAR(255) NOT NULL
+    )
+    """,
+    # Peso de cada cuenta para la rotación ponderada
+    "ALTER TABLE cuentas_claro ADD COLUMN peso INT NOT NULL DEFAULT 1",
+]
+
+# Errores esperables al re-aplicar el esquema (índice/columna ya existente)
+ERRORES_ESQUEMA_IGNORADOS = {1060, 1061}
+
+
+def asegurar_esquema():
+    try:
+        with conexion_mysql() as conn:
+            if not conn:
+                print("[ERROR] No hay conexión MySQL para revisar el esquema.")
+                return
+
+            with conn.cursor() as cursor:
+                for sentencia in ESQUEMA_AUXILIAR:
+                    try:
+                        cursor.execute(sentencia)
+                    except mysql.connector.Error as e:
+                        if e.errno not in ERRORES_ESQUEMA_IGNORADOS:
+                            print(f"⚠️ [MySQL] No se pudo aplicar: {sentencia.strip()} → {e}")
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Error al preparar el esquema de MySQL: {e}")
+
+
+def leer_estado_bot(clave: str, defecto=None):
+    try:
+        with conexion_mysql() as conn:
+            if not conn:
+                return defecto
+
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT valor FROM bot_estado WHERE clave = %s", (clave,))
+                row = cursor.fetchone()
+        return row[0] if row else defecto
+    except Exception as e:
+        print(f"❌ Error leyendo estado '{clave}': {e}")
+        return defecto
+
+
+def guardar_estado_bot(clave: str, valor):
+    try:
+        with conexion_mysql() as conn:
+            if not conn:
+                return
+
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO bot_estado (clave, valor) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+                    """,
+                    (clave, str(valor)),
+                )
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Error guardando estado '{clave}': {e}")
+
+
+class ErrorIMAP(Exception):
+    pass
+
+
+def _citar_imap(texto: str) -> str:
+    return '"' + texto.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+_RE_NOVEDAD_IMAP = re.compile(rb"\* \d+ (EXISTS|RECENT)", re.IGNORECASE)
+
+
+class ClienteIMAPAsync:
+    """
+    Cliente IMAP mínimo sobre asyncio, con lo que usan los lectores:
+    LOGIN, SELECT, UID SEARCH/FETCH, IDLE, NOOP y LOGOUT.
+    Los datos de FETCH tienen el mismo formato que devuelve imaplib.
+    """
+
+    def __init__(self, host: str, port: int, usar_ssl: bool = True):
+        self.host = host
+        self.port = port
+        self.usar_ssl = usar_ssl
+        self.capacidades = set()
+        self.buzon = {}
+        self._reader = None
+        self._writer = None
+        self._tag = 0
+        self._en_idle = False
+        self.cuenta = ""
+
+    async def conectar(self):
+        contexto = ssl.create_default_context() if self.usar_ssl else None
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=contexto), IMAP_TIMEOUT
+        )
+        saludo = await asyncio.wait_for(self._linea(), IMAP_TIMEOUT)
+        if not saludo.startswith(b"* OK"):
+            raise ErrorIMAP(f"Saludo inesperado: {saludo!r}")
+
+    async def _linea(self) -> bytes:
+        linea = await self._reader.readline()
+        if not linea:
+            raise ConnectionError("el servidor IMAP cerró la conexión")
+        return linea.rstrip(b"\r\n")
+
+    async def _enviar(self, texto: bytes):
+        self._writer.write(texto + b"\r\n")
+        await self._writer.drain()
+
+    def _nuevo_tag(self) -> bytes:
+        self._tag += 1
+        return b"A%d" % self._tag
+
+    async def _no_etiquetada(self, linea: bytes):
+        """
+        Lee los literales {n} que sigan a la línea y devuelve (tipo, items),
+        con items como los arma imaplib: [(línea, literal), ..., resto].
+        """
+        partes = linea.split(b" ", 2)
+        tipo = partes[1] if partes[0].isdigit() and len(partes) > 1 else partes[0]
+
+        items = []
+        while True:
+            m = re.search(rb"\{(\d+)\}$", linea)
+            if not m:
+                break
+            literal = await self._reader.readexactly(int(m.group(1)))
+            items.append((linea, literal))
+            linea = await self._linea()
+        items.append(linea)
+        return tipo.upper(), items
+
+    async def _hasta_tag(self, tag: bytes) -> list:
+        respuestas = []
+        while True:
+            linea = await self._linea()
+            if linea.startswith(tag + b" "):
+                estado = linea[len(tag) + 1:]
+                if not estado.upper().startswith(b"OK"):
+                    raise ErrorIMAP(estado.decode(errors="ignore"))
+                return respuestas
+            if linea.startswith(b"* "):
+                respuestas.append(await self._no_etiquetada(linea[2:]))
+
+    async def comando(self, *partes: str) -> list:
+        """
+        Envía un comando y espera su respuesta etiquetada.
+        Devuelve las respuestas no etiquetadas como [(tipo, items)].
+        """
+        tag = self._nuevo_tag()
+        with tiempos_imap.medir(comando=partes[0], cuenta=self.cuenta):
+            await self._enviar(tag + b" " + " ".join(partes).encode())
+            return await asyncio.wait_for(self._hasta_tag(tag), IMAP_TIMEOUT)
+
+    async def login(self, usuario: str, password: str):
+        self.cuenta = usuario
+        await self.comando("LOGIN", _citar_imap(usuario), _citar_imap(password))
+        for tipo, items in await self.comando("CAPABILITY"):
+            if tipo == b"CAPABILITY":
+                self.capacidades = set(items[-1].upper().split()[1:])
+
+    async def select(self, buzon: str = "INBOX") -> dict:
+        self.buzon = {}
+        for tipo, items in await self.comando("SELECT", buzon):
+            m = re.search(rb"\[(UIDVALIDITY|UIDNEXT) (\d+)\]", items[-1])
+            if m:
+                self.buzon[m.group(1).decode()] = int(m.group(2))
+            elif tipo == b"EXISTS":
+                self.buzon["EXISTS"] = int(items[-1].split()[0])
+        return self.buzon
+
+    async def uid_search(self, criterio: str) -> list:
+        uids = []
+        for tipo, items in await self.comando("UID SEARCH", criterio):
+            if tipo == b"SEARCH":
+                uids.extend(int(u) for u in items[-1].split()[1:])
+        return uids
+
+    async def uid_fetch(self, uids, partes: str) -> list:
+        datos = []
+        for tipo, items in await self.comando("UID FETCH", ",".join(map(str, uids)), partes):
+            if tipo == b"FETCH":
+                datos.extend(items)
+        return datos
+
+    async def idle(self, timeout: float) -> bool:
+        """
+        Espera con IDLE (RFC 2177) a que el servidor avise de mails nuevos.
+        Devuelve True si llegó algo, False si venció el timeout sin novedades.
+        """
+        loop = asyncio.get_running_loop()
+        tag = self._nuevo_tag()
+        await self._enviar(tag + b" IDLE")
+
+        hay_novedades = False
+        while True:
+            linea = await asyncio.wait_for(self._linea(), IMAP_TIMEOUT)
+            if linea.startswith(b"+"):
+                self._en_idle = True
+                break
+            if linea.startswith(tag + b" "):
+                raise ErrorIMAP(f"IDLE rechazado: {linea!r}")
+            hay_novedades = hay_novedades or bool(_RE_NOVEDAD_IMAP.match(linea))
+
+        fin = loop.time() + timeout
+        while not hay_novedades:
+            restante = fin - loop.time()
+            if restante <= 0:
+                break
+            try:
+                linea = await asyncio.wait_for(self._linea(), restante)
+            except asyncio.TimeoutError:
+                break
+            hay_novedades = bool(_RE_NOVEDAD_IMAP.match(linea))
+
+        self._en_idle = False
+        await self._enviar(b"DONE")
+        for tipo, _ in await asyncio.wait_for(self._hasta_tag(tag), IMAP_TIMEOUT):
+            hay_novedades = hay_novedades or tipo in (b"EXISTS", b"RECENT")
+        return hay_novedades
+
+    async def noop(self) -> bool:
+        """
+        Alternativa a IDLE: con NOOP el servidor informa cambios en el buzón.
+        """
+        return any(tipo in (b"EXISTS", b"RECENT") for tipo, _ in await self.comando("NOOP"))
+
+    async def logout(self):
+        if not self._writer:
+            return
+        try:
+            # Si se canceló en medio de un IDLE, el servidor no atiende
+            # otro comando hasta recibir el DONE
+            if self._en_idle:
+                self._en_idle = False
+                await self._enviar(b"DONE")
+            await asyncio.wait_for(self.comando("LOGOUT"), 5)
+        except Exception:
+            pass
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+        self._writer = None
+
+
+async def imap_connect_safe(email_addr: str, password: str, limite=None):
     """
-    Conexión robusta a IMAP con reintentos.
+    Conexión robusta a IMAP con reintentos, sin bloquear el loop.
     Maneja errores de red, EOF, timeouts, etc.
+    'limite' es un semáforo opcional para acotar los logins simultáneos.
     """
     for intento in range(5):
+        imap = ClienteIMAPAsync(IMAP_HOST, IMAP_PORT, IMAP_SSL)
         try:
-            M = imaplib.IMAP4_SSL("imap.gmail.com")
-            M.login(email_addr, password)
-            M.select("inbox")
-            return M
+            async with limite or nullcontext():
+                with tiempos_imap_conexion.medir(cuenta=email_addr):
+                    await imap.conectar()
+                    await imap.login(email_addr, password)
+                    await imap.select("INBOX")
+            return imap
         except Exception as e:
             print(f"[IMAP] Error de conexión ({email_addr}) Reintento {intento + 1}/5 → {e}")
-            time.sleep(4)
+            await imap.logout()
+            await asyncio.sleep(4)
 
     print(f"❌ IMAP caído para {email_addr}. Esperando 60 segundos antes de reintentar.")
-    time.sleep(60)
+    await asyncio.sleep(60)
     return None
 
 
@@ -116,74 +902,71 @@ def imap_connect_safe(email_addr: str, password: str):
 # USUARIOS (MySQL + memoria)
 # ============================================================
 
-def guardar_usuario_en_mysql(telegram_id: int, datos: dict):
+def _usuario_guardable(datos: dict) -> bool:
     """
-    Guarda o actualiza un usuario, pero evita crear registros incompletos.
-    Solo guarda si el usuario está creando su nombre o ya tiene usuario_creado.
+    Solo se guarda si el usuario está creando su nombre o ya tiene usuario_creado.
     """
-    if not datos.get("usuario_creado") and datos.get("estado") not in (
+    return bool(datos.get("usuario_creado")) or datos.get("estado") in (
         "esperando_nombre",
         "creando_usuario",
-    ):
-        print(
-            f"⚠️ No se guarda el usuario {telegram_id} porque aún no tiene usuario_creado. "
-            f"Estado: {datos.get('estado')}"
+    )
+
+
+def guardar_usuarios_en_mysql(lote: dict) -> int:
+    """
+    Guarda o actualiza varios usuarios con un único INSERT ... ON DUPLICATE KEY UPDATE.
+    lote: {telegram_id: datos}. Omite los registros incompletos y devuelve
+    cuántos se escribieron. Lanza excepción si MySQL no está disponible,
+    así quien llama puede reintentar.
+    """
+    filas = [
+        (
+            telegram_id,
+            datos.get("nombre_usuario"),
+            datos.get("usuario_creado"),
+            datos.get("estado"),
+            datos.get("nombre_cuenta"),
+            datos.get("monto"),
         )
-        return
+        for telegram_id, datos in lote.items()
+        if _usuario_guardable(datos)
+    ]
+    if not filas:
+        return 0
 
-    conn = None
-    cursor = None
-    try:
-        conn = mysql_connect_safe()
+    with conexion_mysql() as conn:
         if not conn:
-            return
+            raise RuntimeError("MySQL no disponible")
 
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO usuarios (telegram_id, nombre_usuario, usuario_creado, estado, nombre_cuenta, monto)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                nombre_usuario = VALUES(nombre_usuario),
-                usuario_creado = VALUES(usuario_creado),
-                estado = VALUES(estado),
-                nombre_cuenta = VALUES(nombre_cuenta),
-                monto = VALUES(monto)
-            """,
-            (
-                telegram_id,
-                datos.get("nombre_usuario"),
-                datos.get("usuario_creado"),
-                datos.get("estado"),
-                datos.get("nombre_cuenta"),
-                datos.get("monto"),
-            ),
-        )
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO usuarios (telegram_id, nombre_usuario, usuario_creado, estado, nombre_cuenta, monto)
+                VALUES """
+                + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(filas))
+                + """
+                ON DUPLICATE KEY UPDATE
+                    nombre_usuario = VALUES(nombre_usuario),
+                    usuario_creado = VALUES(usuario_creado),
+                    estado = VALUES(estado),
+                    nombre_cuenta = VALUES(nombre_cuenta),
+                    monto = VALUES(monto)
+                """,
+                [valor for fila in filas for valor in fila],
+            )
         conn.commit()
-        print(f"💾 Usuario {telegram_id} guardado correctamente.")
-    except Exception as e:
-        print(f"❌ Error al guardar usuario {telegram_id}: {e}")
-    finally:
-        try:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-        except Exception:
-            pass
+    return len(filas)
 
 
 def cargar_usuario_desde_mysql(telegram_id: int) -> dict:
-    conn = None
-    cursor = None
     try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return {}
+        with conexion_mysql() as conn:
+            if not conn:
+                return {}
 
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM usuarios WHERE telegram_id = %s", (telegram_id,))
-        row = cursor.fetchone()
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute("SELECT * FROM usuarios WHERE telegram_id = %s", (telegram_id,))
+                row = cursor.fetchone()
         if not row:
             return {}
 
@@ -203,14 +986,294 @@ def cargar_usuario_desde_mysql(telegram_id: int) -> dict:
     except Exception as e:
         print(f"❌ Error cargando usuario: {e}")
         return {}
-    finally:
+
+
+class CacheSesiones:
+    """
+    Sesiones de usuarios en memoria, acotadas en tamaño y con vencimiento por
+    inactividad. Se usa como un dict desde el handler; las sesiones que salen
+    del cache se guardan en MySQL en segundo plano, así la memoria no crece
+    con cada jugador que alguna vez escribió.
+    """
+
+    def __init__(self, maximo: int, ttl: int):
+        self.maximo = max(1, maximo)
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._datos: "OrderedDict" = OrderedDict()  # telegram_id -> (datos, ultimo_uso)
+
+    def __contains__(self, telegram_id) -> bool:
+        return telegram_id in self._datos
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def __getitem__(self, telegram_id) -> dict:
+        datos, _ = self._datos[telegram_id]
+        self._tocar(telegram_id, datos)
+        return datos
+
+    def __setitem__(self, telegram_id, datos: dict):
+        self._tocar(telegram_id, datos)
+        while len(self._datos) > self.maximo:
+            self._desalojar(next(iter(self._datos)))
+
+    def _tocar(self, telegram_id, datos: dict):
+        self._datos[telegram_id] = (datos, time.monotonic())
+        self._datos.move_to_end(telegram_id)
+
+    def setdefault(self, telegram_id, defecto: dict) -> dict:
+        if telegram_id not in self._datos:
+            self[telegram_id] = defecto
+        return self[telegram_id]
+
+    def obtener(self, telegram_id):
+        """
+        Devuelve la sesión en memoria (o None) y lleva la cuenta de aciertos y fallos.
+        """
+        entrada = self._datos.get(telegram_id)
+        if entrada is None or time.monotonic() - entrada[1] > self.ttl:
+            if entrada is not None:
+                self._desalojar(telegram_id)
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return self[telegram_id]
+
+    def _desalojar(self, telegram_id):
+        datos, _ = self._datos.pop(telegram_id)
+        self.desalojos += 1
+        persistencia_usuarios.registrar(telegram_id, datos)
+
+    def purgar_vencidos(self) -> int:
+        """
+        Saca las sesiones inactivas hace más de ttl segundos (las más viejas
+        están al principio, así que se corta en la primera vigente).
+        """
+        limite = time.monotonic() - self.ttl
+        purgadas = 0
+        while self._datos:
+            telegram_id, (_, ultimo_uso) = next(iter(self._datos.items()))
+            if ultimo_uso > limite:
+                break
+            self._desalojar(telegram_id)
+            purgadas += 1
+        return purgadas
+
+    def estadisticas(self) -> dict:
+        return {
+            "sesiones": len(self._datos),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+        }
+
+
+usuarios = CacheSesiones(SESIONES_MAX, SESIONES_TTL_SEGUNDOS)
+
+metricas.indicador(
+    "bot_sesiones", "Sesiones de usuarios en memoria", lambda: usuarios.estadisticas()["sesiones"]
+)
+
+
+async def purgar_sesiones():
+    """
+    Vence periódicamente las sesiones inactivas.
+    """
+    while True:
+        await asyncio.sleep(min(60, max(1, SESIONES_TTL_SEGUNDOS // 2)))
+        purgadas = usuarios.purgar_vencidos()
+        if purgadas:
+            print(f"🧹 Se liberaron {purgadas} sesiones inactivas.")
+
+
+class PersistenciaUsuarios:
+    """
+    Escritura diferida de usuarios en MySQL. Los cambios de estado se anotan
+    en memoria (el último gana para cada telegram_id) y se vuelcan cada
+    `intervalo` segundos en un solo upsert de varias filas. Las transiciones
+    críticas (usuario creado, fichas movidas) piden un volcado inmediato y
+    esperan a que quede en la base.
+    """
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self.escrituras = 0
+        self.coalescidos = 0
+        self.volcados = 0
+        self._pendientes = {}  # telegram_id -> copia de los datos
+        self._lock = threading.Lock()
+        self._volcando = None  # asyncio.Lock, se crea dentro del loop
+
+    def registrar(self, telegram_id, datos: dict):
+        """
+        Anota una copia de la sesión para el próximo volcado.
+        """
+        with self._lock:
+            if telegram_id in self._pendientes:
+                self.coalescidos += 1
+            self._pendientes[telegram_id] = dict(datos)
+
+    def pendiente(self, telegram_id):
+        """
+        Datos aún no volcados de un usuario (o None), para no leer de MySQL
+        una versión más vieja que la que está esperando ser escrita.
+        """
+        with self._lock:
+            datos = self._pendientes.get(telegram_id)
+        return dict(datos) if datos is not None else None
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    async def guardar(self, telegram_id, datos: dict, inmediato: bool = False):
+        self.registrar(telegram_id, datos)
+        if inmediato:
+            await self.volcar()
+
+    async def volcar(self):
+        """
+        Escribe todo lo pendiente. Los volcados se hacen de a uno, así un lote
+        viejo nunca pisa en la base a uno más nuevo.
+        """
+        if self._volcando is None:
+            self._volcando = asyncio.Lock()
+
+        async with self._volcando:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, {}
+            if not lote:
+                return
+
+            try:
+                self.escrituras += await db_async(guardar_usuarios_en_mysql, lote)
+                self.volcados += 1
+            except Exception as e:
+                print(f"❌ Error al guardar {len(lote)} usuarios: {e}")
+                # Se reencolan salvo que ya haya una versión más nueva
+                with self._lock:
+                    for telegram_id, datos in lote.items():
+                        self._pendientes.setdefault(telegram_id, datos)
+
+    async def procesar(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            await self.volcar()
+
+    def estadisticas(self) -> dict:
+        return {
+            "pendientes": self.pendientes(),
+            "escrituras": self.escrituras,
+            "coalescidos": self.coalescidos,
+            "volcados": self.volcados,
+        }
+
+
+persistencia_usuarios = PersistenciaUsuarios(USUARIOS_VOLCADO_SEGUNDOS)
+
+
+async def sesion_de_jugador(telegram_id):
+    """
+    Sesión del jugador: la que está en memoria o, si se venció o nunca se
+    cargó, la que espera volcado o la de MySQL (y vuelve a quedar en
+    memoria). None si el jugador no está registrado.
+    """
+    datos = usuarios.obtener(telegram_id)
+    if datos is None:
+        datos = persistencia_usuarios.pendiente(telegram_id) or await db_async(
+            cargar_usuario_desde_mysql, telegram_id
+        )
+        if not datos:
+            return None
+        usuarios[telegram_id] = datos
+    return datos
+
+
+class TurnosJugadores:
+    """
+    Cerrojo por jugador: lo que dispara un mismo telegram_id se ejecuta de a
+    una cosa y en orden de llegada (un doble toque no lanza dos operaciones
+    pisadas), mientras que jugadores distintos avanzan en paralelo. El tope
+    de trabajo simultáneo en BlueDay lo sigue poniendo executor_blueday.
+    Los cerrojos se crean al usarse y se borran cuando el jugador no tiene
+    nada en cola.
+    """
+
+    MAX_PICOS = 100
+
+    def __init__(self):
+        self.encolados = 0  # operaciones que tuvieron que esperar a otra del mismo jugador
+        self._turnos = {}  # telegram_id -> [asyncio.Lock, en_cola]
+        self._picos: "OrderedDict" = OrderedDict()  # telegram_id -> máxima cola vista
+
+    @asynccontextmanager
+    async def turno(self, telegram_id):
+        entrada = self._turnos.get(telegram_id)
+        if entrada is None:
+            entrada = self._turnos[telegram_id] = [asyncio.Lock(), 0]
+        entrada[1] += 1
+        if entrada[1] > 1:
+            self.encolados += 1
+            self._anotar_pico(telegram_id, entrada[1])
+
         try:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-        except Exception:
-            pass
+            async with entrada[0]:
+                yield
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del self._turnos[telegram_id]
+
+    def _anotar_pico(self, telegram_id, profundidad: int):
+        self._picos[telegram_id] = max(profundidad, self._picos.get(telegram_id, 0))
+        self._picos.move_to_end(telegram_id)
+        while len(self._picos) > self.MAX_PICOS:
+            self._picos.popitem(last=False)
+
+    def profundidad(self, telegram_id) -> int:
+        entrada = self._turnos.get(telegram_id)
+        return entrada[1] if entrada else 0
+
+    def calientes(self, cantidad: int = 5) -> list:
+        """
+        Jugadores con más operaciones en cola ahora: [(telegram_id, en_cola)].
+        """
+        # list(): también se consulta desde el hilo del servidor de métricas
+        activos = [(tid, entrada[1]) for tid, entrada in list(self._turnos.items()) if entrada[1] > 1]
+        return sorted(activos, key=lambda t: t[1], reverse=True)[:cantidad]
+
+    def estadisticas(self) -> dict:
+        return {
+            "jugadores_activos": len(self._turnos),
+            "en_cola": sum(entrada[1] for entrada in list(self._turnos.values())),
+            "encolados": self.encolados,
+            "calientes": self.calientes(),
+            "picos": sorted(self._picos.items(), key=lambda t: t[1], reverse=True)[:5],
+        }
+
+
+turnos_jugadores = TurnosJugadores()
+
+metricas.indicador(
+    "bot_turnos_jugadores", "Jugadores con operaciones en curso o esperando turno",
+    lambda: turnos_jugadores.estadisticas()["jugadores_activos"],
+)
+metricas.indicador(
+    "bot_turnos_en_cola", "Operaciones de jugadores en curso o esperando turno",
+    lambda: turnos_jugadores.estadisticas()["en_cola"],
+)
+metricas.indicador(
+    "bot_turnos_encolados", "Operaciones que esperaron a otra del mismo jugador (acumulado)",
+    lambda: turnos_jugadores.encolados,
+)
+metricas.indicador(
+    "bot_turnos_profundidad", "Cola de los jugadores con más operaciones esperando",
+    lambda: {(str(tid),): en_cola for tid, en_cola in turnos_jugadores.calientes()},
+    ("jugador",),
+)
 
 
 # ============================================================
@@ -234,34 +1297,169 @@ def generar_nombre_usuario(nombre_cliente: str) -> str:
 # SELENIUM BLUEDAY / CLUBUNO
 # ============================================================
 
-def iniciar_sesion_blueday():
+# Recursos que el perfil liviano no descarga (el CSS sí: sin él no se puede
+# saber si un botón es visible o clickeable)
+RECURSOS_BLOQUEADOS_CHROME = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+]
+
+
+def _opciones_chrome(perfil: str, ranura=None) -> Options:
+    options = Options()
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-infobars")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    if perfil != "liviano":
+        options.add_argument("--start-maximized")
+        return options
+
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1366,768")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--mute-audio")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option(
+        "prefs",
+        {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        },
+    )
+    # No espera imágenes ni subrecursos: las operaciones ya esperan sus elementos
+    options.page_load_strategy = "eager"
+
+    # Dos Chrome no pueden compartir carpeta de datos: una por lugar del pool
+    if BLUEDAY_CHROME_DATOS and ranura is not None:
+        options.add_argument(
+            "--user-data-dir=" + os.path.join(BLUEDAY_CHROME_DATOS, f"blueday-{ranura}")
+        )
+    return options
+
+
+def _crear_driver_chrome(ranura=None, perfil: str = None):
+    perfil = perfil or BLUEDAY_CHROME_PERFIL
+    service = Service(CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(service=service, options=_opciones_chrome(perfil, ranura))
+
+    if perfil == "liviano":
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": RECURSOS_BLOQUEADOS_CHROME})
+        except Exception as e:
+            print(f"⚠️ No se pudo activar el bloqueo de recursos en Chrome: {e}")
+    return driver
+
+
+def _pagina_quieta(driver) -> bool:
+    return driver.execute_script(
+        "return document.readyState === 'complete'"
+        " && (!window.jQuery || window.jQuery.active === 0);"
+    )
+
+
+def _esperar(driver, segundos: float, condicion=None, timeout: float = 10, ajax: bool = True):
     """
-    Abre navegador y loguea en la plataforma de administración.
+    Pausa entre pasos de Selenium. En modo legacy duerme `segundos`; en modo
+    rápido espera la condición indicada (si hay) y que la página no tenga
+    pedidos AJAX en curso. Con ajax=False y sin condición no espera nada.
     """
-    driver = None
-    try:
-        options = Options()
-        options.add_argument("--disable-notifications")
-        options.add_argument("--start-maximized")
-        options.add_argument("--disable-infobars")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
+    if not BLUEDAY_MODO_RAPIDO:
+        time.sleep(segundos)
+        return
 
-        service = Service(CHROMEDRIVER_PATH)
-        driver = webdriver.Chrome(service=service, options=options)
+    if condicion is not None:
+        WebDriverWait(driver, timeout).until(condicion)
+    if ajax:
+        WebDriverWait(driver, timeout).until(_pagina_quieta)
 
-        driver.get("https://admin.clubuno.net")
 
-        input_usuario = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, '//*[@id="user"]'))
-        )
-        input_contrasena = driver.find_element(By.XPATH, '//*[@id="passwd"]')
+def _valores_monto(texto: str) -> set:
+    """
+    Lecturas posibles del valor de un campo de monto ("7000.5", "7.000,50").
+    """
+    texto = (texto or "").strip()
+    valores = set()
+    for candidato in (texto, texto.replace(".", "").replace(",", ".")):
+        try:
+            valores.add(round(float(candidato), 2))
+        except ValueError:
+            pass
+    return valores
+
+
+def _escribir_monto(driver, input_monto, monto, pausa_por_tecla: float):
+    """
+    Escribe el monto en el campo. En modo legacy tecla por tecla con pausa;
+    en modo rápido de una vez por JS (disparando input/change como si se
+    tipeara) y verificando que el campo quedó con ese valor. Si la página no
+    toma el valor por JS, se tipea de corrido.
+    """
+    texto = str(monto)
+
+    if not BLUEDAY_MODO_RAPIDO:
+        for c in texto:
+            input_monto.send_keys(c)
+            time.sleep(pausa_por_tecla)
+        return
+
+    esperado = round(float(monto), 2)
+    driver.execute_script(
+        "const e = arguments[0]; e.focus(); e.value = arguments[1];"
+        "e.dispatchEvent(new Event('input', {bubbles: true}));"
+        "e.dispatchEvent(new Event('change', {bubbles: true}));",
+        input_monto,
+        texto,
+    )
+    if esperado in _valores_monto(input_monto.get_attribute("value")):
+        return
+
+    input_monto.send_keys(Keys.CONTROL, "a")
+    input_monto.send_keys(Keys.DELETE)
+    input_monto.send_keys(texto)
+    WebDriverWait(driver, 5).until(
+        lambda d: esperado in _valores_monto(input_monto.get_attribute("value"))
+    )
+
+
+def _login_blueday(driver):
+    driver.get(URL_BLUEDAY)
+
+    input_usuario = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.XPATH, '//*[@id="user"]'))
+    )
+    input_contrasena = driver.find_element(By.XPATH, '//*[@id="passwd"]')
+
+    input_usuario.send_keys(usuario_admin)
+    input_contrasena.send_keys(contrasena_admin)
+
+    driver.find_element(By.XPATH, '//*[@id="dologin"]').click()
+    _esperar(
+        driver,
+        5,
+        EC.invisibility_of_element_located((By.XPATH, '//*[@id="passwd"]')),
+        timeout=20,
+    )
 
-        input_usuario.send_keys(usuario_admin)
-        input_contrasena.send_keys(contrasena_admin)
 
-        driver.find_element(By.XPATH, '//*[@id="dologin"]').click()
-        time.sleep(5)
+def iniciar_sesion_blueday(ranura=None):
+    """
+    Abre navegador y loguea en la plataforma de administración.
+    Con un perfil persistente la sesión puede seguir viva desde la vez
+    anterior: en ese caso no se vuelve a loguear.
+    """
+    driver = None
+    try:
+        driver = _crear_driver_chrome(ranura)
+        perfil_persistente = (
+            BLUEDAY_CHROME_PERFIL == "liviano" and BLUEDAY_CHROME_DATOS and ranura is not None
+        )
+        if not (perfil_persistente and sesion_blueday_valida(driver)):
+            _login_blueday(driver)
 
         print("✅ Sesión iniciada correctamente en BlueDay.")
         return driver
@@ -275,12 +1473,278 @@ def iniciar_sesion_blueday():
         return None
 
 
+def sesion_blueday_valida(driver) -> bool:
+    """
+    Chequeo de salud de un navegador del pool.
+    Vuelve a la página principal (así cada operación arranca del mismo lugar)
+    y verifica que Chrome responda y que la sesión no haya expirado.
+    """
+    try:
+        driver.get(URL_BLUEDAY)
+        WebDriverWait(driver, 10).until(
+            lambda d: d.find_elements(By.XPATH, '//*[@id="UserSearch"]')
+            or d.find_elements(By.XPATH, '//*[@id="passwd"]')
+        )
+        # Si aparece el formulario de login, la sesión expiró
+        return not driver.find_elements(By.XPATH, '//*[@id="passwd"]')
+    except Exception:
+        return False
+
+
+class PoolBlueDay:
+    """
+    Pool de navegadores ya logueados en BlueDay.
+    Cada operación toma un driver, lo usa y lo devuelve: abrir Chrome y
+    loguearse se paga una sola vez por navegador y no en cada pedido.
+    """
+
+    def __init__(self, tamano: int):
+        self.tamano = max(1, tamano)
+        self._libres: "Queue" = Queue()
+        self._creados = 0
+        self._lock = threading.Lock()
+        # Cada navegador ocupa un lugar numerado (su carpeta de datos de Chrome)
+        self._ranuras_libres = list(range(self.tamano))
+        self._ranuras = {}  # id(driver) -> lugar
+        self._drivers = {}  # id(driver) -> driver, libres y prestados
+        self._cerrado = False
+
+    def _reservar_lugar(self):
+        """
+        Devuelve el número de lugar reservado, o None si el pool está lleno.
+        """
+        with self._lock:
+            if self._creados < self.tamano:
+                self._creados += 1
+                return self._ranuras_libres.pop(0)
+            return None
+
+    def _liberar_lugar(self, ranura):
+        with self._lock:
+            self._creados -= 1
+            self._ranuras_libres.append(ranura)
+
+    def _nuevo_driver(self, ranura):
+        driver = iniciar_sesion_blueday(ranura)
+        if not driver:
+            self._liberar_lugar(ranura)
+            return None
+        with self._lock:
+            if not self._cerrado:
+                self._ranuras[id(driver)] = ranura
+                self._drivers[id(driver)] = driver
+                return driver
+        # El pool se cerró mientras este Chrome arrancaba
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self._liberar_lugar(ranura)
+        return None
+
+    def _descartar(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            ranura = self._ranuras.pop(id(driver), None)
+            self._drivers.pop(id(driver), None)
+        if ranura is not None:
+            self._liberar_lugar(ranura)
+
+    def _revisar(self, driver):
+        """
+        Devuelve el driver listo para usar: si la sesión expiró se vuelve a
+        loguear, y si Chrome no responde se reemplaza por uno nuevo.
+        """
+        if driver is None:
+            # Aviso de cierre: se deja para el próximo que esté esperando
+            self._libres.put(None)
+            return None
+
+        if sesion_blueday_valida(driver):
+            return driver
+
+        try:
+            print("🔁 Sesión de BlueDay expirada. Volviendo a loguear...")
+            _login_blueday(driver)
+            if sesion_blueday_valida(driver):
+                return driver
+        except Exception as e:
+            print(f"⚠️ No se pudo reloguear el navegador: {e}")
+
+        self._descartar(driver)
+        ranura = self._reservar_lugar()
+        if ranura is not None:
+            return self._nuevo_driver(ranura)
+        return None
+
+    def obtener(self, timeout: float = 120):
+        """
+        Toma un navegador libre. Si no hay y no se llegó al tamaño del pool,
+        abre uno nuevo; si no, espera a que otro pedido devuelva el suyo.
+        """
+        if self._cerrado:
+            return None
+
+        try:
+            return self._revisar(self._libres.get_nowait())
+        except Empty:
+            pass
+
+        ranura = self._reservar_lugar()
+        if ranura is not None:
+            return self._nuevo_driver(ranura)
+
+        try:
+            driver = self._libres.get(timeout=timeout)
+        except Empty:
+            print("❌ No hay navegadores de BlueDay disponibles.")
+            return None
+        return self._revisar(driver)
+
+    def devolver(self, driver, roto: bool = False):
+        if driver is None:
+            return
+        if roto or self._cerrado:
+            self._descartar(driver)
+        else:
+            self._libres.put(driver)
+
+    @contextmanager
+    def sesion(self):
+        driver = self.obtener()
+        roto = False
+        try:
+            yield driver
+        except Exception:
+            roto = True
+            raise
+        finally:
+            self.devolver(driver, roto)
+
+    def precalentar(self):
+        """
+        Abre y loguea todos los navegadores del pool de antemano,
+        para que el primer pedido no pague el arranque.
+        """
+        while True:
+            ranura = self._reservar_lugar()
+            if ranura is None:
+                break
+            driver = self._nuevo_driver(ranura)
+            if not driver:
+                break
+            self._libres.put(driver)
+        print(f"🌐 Pool de BlueDay listo con {self._creados} navegadores.")
+
+    def cerrar(self):
+        """
+        Cierra todos los navegadores, también los que están prestados: un
+        Chrome que queda vivo mantiene bloqueada su carpeta de datos para el
+        próximo arranque. Lo que se devuelva después se cierra al devolverse.
+        """
+        with self._lock:
+            self._cerrado = True
+            drivers = list(self._drivers.values())
+        while True:
+            try:
+                self._libres.get_nowait()
+            except Empty:
+                break
+        for driver in drivers:
+            self._descartar(driver)
+        # Despierta a los pedidos que esperan un navegador libre
+        self._libres.put(None)
+
+
+pool_blueday = PoolBlueDay(BLUEDAY_POOL_SIZE)
+
+
+def ejecutar_en_blueday(funcion, *args):
+    """
+    Toma un navegador del pool, ejecuta funcion(driver, *args) y lo devuelve.
+    Devuelve False si no hay ningún navegador disponible.
+    """
+    with pool_blueday.sesion() as driver:
+        if not driver:
+            return False
+        with tiempos_selenium.medir(funcion=funcion.__name__):
+            return funcion(driver, *args)
+
+
+class ExecutorBlueDay:
+    """
+    Ejecuta los trabajos de Selenium en hilos propios, fuera del loop de Telethon.
+    Los handlers hacen `await executor_blueday.ejecutar(backend_blueday.<operación>, ...)`
+    y siguen atendiendo a los demás jugadores mientras el navegador trabaja.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="blueday"
+        )
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pendientes(self) -> int:
+        """Trabajos encolados o en ejecución."""
+        return self._pendientes
+
+    def _terminado(self, _futuro):
+        with self._lock:
+            self._pendientes -= 1
+
+    @staticmethod
+    def _medido(operacion: str, encolado: float, funcion, *args):
+        espera_blueday.observar(time.perf_counter() - encolado, operacion=operacion)
+        try:
+            with tiempos_blueday.medir(operacion=operacion):
+                resultado = funcion(*args)
+        except Exception:
+            fallos_blueday.inc(operacion=operacion)
+            raise
+        if resultado is False:
+            fallos_blueday.inc(operacion=operacion)
+        return resultado
+
+    def _encolar(self, operacion: str, funcion, *args) -> "asyncio.Future":
+        with self._lock:
+            self._pendientes += 1
+        futuro = self._executor.submit(
+            self._medido, operacion, time.perf_counter(), funcion, *args
+        )
+        futuro.add_done_callback(self._terminado)
+        return asyncio.wrap_future(futuro)
+
+    def ejecutar(self, funcion, *args) -> "asyncio.Future":
+        """
+        Encola funcion(*args) y devuelve un futuro awaitable con su resultado.
+        Debe llamarse desde el loop de asyncio.
+        """
+        return self._encolar(funcion.__name__, funcion, *args)
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+executor_blueday = ExecutorBlueDay(BLUEDAY_WORKERS)
+
+metricas.indicador(
+    "bot_blueday_pendientes", "Trabajos de BlueDay encolados o en ejecución",
+    lambda: executor_blueday.pendientes,
+)
+
+
 def crear_usuario_en_blueday(driver, nombre_usuario: str) -> bool:
     try:
         WebDriverWait(driver, 20).until(
             EC.element_to_be_clickable((By.XPATH, '//*[@id="NewPlayerButton"]'))
         ).click()
-        time.sleep(2)
+        _esperar(driver, 2, ajax=False)
 
         input_usuario = WebDriverWait(driver, 20).until(
             EC.visibility_of_element_located((By.XPATH, '//*[@id="NewUserPlayerUsername"]'))
@@ -299,7 +1763,11 @@ def crear_usuario_en_blueday(driver, nombre_usuario: str) -> bool:
             EC.element_to_be_clickable((By.XPATH, '//*[@id="ModalNewUserPlayerSubmit"]'))
         ).click()
 
-        time.sleep(3)
+        _esperar(
+            driver,
+            3,
+            EC.invisibility_of_element_located((By.XPATH, '//*[@id="NewUserPlayerUsername"]')),
+        )
         print(f"✅ Usuario {nombre_usuario} creado correctamente en BlueDay.")
         return True
     except Exception as e:
@@ -307,26 +1775,52 @@ def crear_usuario_en_blueday(driver, nombre_usuario: str) -> bool:
         return False
 
 
-def cargar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool:
-    try:
-        search_box = driver.find_element(By.XPATH, '//*[@id="UserSearch"]')
-        search_box.clear()
-        search_box.send_keys(nombre_usuario)
-        time.sleep(1)
+def _fila_de_usuario(driver, nombre_usuario: str):
+    """
+    Fila de los resultados de búsqueda que corresponde a nombre_usuario, "sin
+    resultados" si BlueDay no lo encontró, o None si todavía no hay nada
+    que sirva. La fila tiene que nombrar al usuario como palabra completa: las
+    filas que quedaron de la búsqueda anterior (la búsqueda se dispara con
+    demora) o de un usuario parecido ("pepe" / "pepe2") no cuentan.
+    """
+    patron = re.compile(rf"(?<![\w.]){re.escape(nombre_usuario)}(?![\w.])", re.IGNORECASE)
+    for fila in driver.find_elements(By.XPATH, '//*[@id="UserSearchDiv"]/div'):
+        if patron.search(fila.text or ""):
+            return fila
+    if driver.find_elements(By.XPATH, '//div[contains(text(), "No users found")]'):
+        return "sin resultados"
+    return None
+
 
-        no_results = driver.find_elements(
-            By.XPATH, '//div[contains(text(), "No users found")]'
-        )
-        if no_results:
+def _abrir_modal_credito(driver, nombre_usuario: str, columna: int) -> bool:
+    """
+    Busca al jugador y abre el modal de crédito desde su fila (columna 2:
+    cargar, 3: retirar). Devuelve False si BlueDay no lo encuentra.
+    """
+    search_box = driver.find_element(By.XPATH, '//*[@id="UserSearch"]')
+    search_box.clear()
+    search_box.send_keys(nombre_usuario)
+    _esperar(driver, 1, lambda d: _fila_de_usuario(d, nombre_usuario))
+
+    for _ in range(3):
+        fila = WebDriverWait(driver, 15).until(lambda d: _fila_de_usuario(d, nombre_usuario))
+        if fila == "sin resultados":
             print(f"❌ BlueDay no encontró al usuario '{nombre_usuario}'.")
             return False
+        try:
+            boton = fila.find_element(By.XPATH, f"./div[{columna}]/button")
+            driver.execute_script("arguments[0].click();", boton)
+            return True
+        except StaleElementReferenceException:
+            # La lista se volvió a dibujar entre la búsqueda y el click
+            continue
+    raise RuntimeError(f"los resultados de búsqueda de '{nombre_usuario}' no se estabilizan")
 
-        boton_cargar = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, '//*[@id="UserSearchDiv"]/div/div[2]/button')
-            )
-        )
-        driver.execute_script("arguments[0].click();", boton_cargar)
+
+def cargar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool:
+    try:
+        if not _abrir_modal_credito(driver, nombre_usuario, columna=2):
+            return False
 
         WebDriverWait(driver, 15).until(
             EC.visibility_of_element_located((By.XPATH, '//*[@id="ModalCreditAmount"]'))
@@ -336,9 +1830,7 @@ def cargar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool:
         input_monto.send_keys(Keys.CONTROL, "a")
         input_monto.send_keys(Keys.DELETE)
 
-        for c in str(monto):
-            input_monto.send_keys(c)
-            time.sleep(0.03)
+        _escribir_monto(driver, input_monto, monto, 0.03)
 
         valor_final = input_monto.get_attribute("value").strip()
         valor_normalizado = valor_final.replace(".", "").replace(",", ".").strip()
@@ -369,18 +1861,42 @@ def cargar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool:
         return False
 
 
+def cargar_fichas_en_lote(driver, trabajos: list) -> list:
+    """
+    Carga fichas a varios jugadores [(nombre_usuario, monto)] uno detrás de
+    otro en la misma página ya logueada. Devuelve un resultado por trabajo:
+    si uno falla se recarga la página (puede haber quedado un modal abierto)
+    y se sigue con el resto.
+    """
+    resultados = []
+    recargar = False
+    for nombre_usuario, monto in trabajos:
+        try:
+            if recargar:
+                driver.get(URL_BLUEDAY)
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.XPATH, '//*[@id="UserSearch"]'))
+                )
+        except Exception as e:
+            print(f"⚠️ No se pudo volver a la página principal de BlueDay: {e}")
+        exito = cargar_fichas_en_blueday(driver, nombre_usuario, monto)
+        resultados.append(exito)
+        recargar = not exito
+    return resultados
+
+
 def retirar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool:
     try:
-        search_box = driver.find_element(By.XPATH, '//*[@id="UserSearch"]')
-        search_box.clear()
-        search_box.send_keys(nombre_usuario)
-
-        WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, '//*[@id="UserSearchDiv"]/div/div[3]/button')
-            )
-        ).click()
-        time.sleep(2)
+        if not _abrir_modal_credito(driver, nombre_usuario, columna=3):
+            return False
+        # El saldo se completa por AJAX después de abrir el modal
+        _esperar(
+            driver,
+            2,
+            lambda d: d.find_element(
+                By.XPATH, '//*[@id="ModalCreditDestinationBalance"]'
+            ).get_attribute("value").strip(),
+        )
 
         saldo_input = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located(
@@ -401,13 +1917,11 @@ def retirar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool
         )
         driver.execute_script("arguments[0].scrollIntoView(true);", input_monto)
         input_monto.click()
-        time.sleep(0.2)
+        _esperar(driver, 0.2, ajax=False)
         input_monto.send_keys(Keys.CONTROL, "a")
         input_monto.send_keys(Keys.DELETE)
 
-        for char in str(monto):
-            input_monto.send_keys(char)
-            time.sleep(0.1)
+        _escribir_monto(driver, input_monto, monto, 0.1)
 
         driver.find_element(By.TAG_NAME, "body").click()
 
@@ -418,6 +1932,11 @@ def retirar_fichas_en_blueday(driver, nombre_usuario: str, monto: float) -> bool
         driver.execute_script("arguments[0].scrollIntoView(true);", boton_confirmar)
         driver.execute_script("arguments[0].click();", boton_confirmar)
 
+        WebDriverWait(driver, 10).until(
+            EC.invisibility_of_element_located((By.XPATH, '//*[@id="ModalCreditAmount"]'))
+        )
+        _esperar(driver, 1)
+
         print(f"✅ Se han retirado {monto} fichas de {nombre_usuario}.")
         return True
     except Exception as e:
@@ -431,7 +1950,7 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
             EC.presence_of_element_located((By.XPATH, '/html/body/header/nav/div[1]/a/i'))
         )
         driver.execute_script("arguments[0].click();", menu_btn)
-        time.sleep(1)
+        _esperar(driver, 1, ajax=False)
 
         user_section = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located(
@@ -439,7 +1958,12 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
             )
         )
         driver.execute_script("arguments[0].click();", user_section)
-        time.sleep(2)
+        # El panel también tiene #UserSearch: esperar un elemento propio de la sección
+        _esperar(
+            driver,
+            2,
+            EC.presence_of_element_located((By.XPATH, '//*[@id="UserSearchButton"]')),
+        )
 
         search_box = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, '//*[@id="UserSearch"]'))
@@ -447,7 +1971,7 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
         search_box.clear()
         search_box.send_keys(nombre_usuario)
         driver.find_element(By.XPATH, '//*[@id="UserSearchButton"]').click()
-        time.sleep(2)
+        _esperar(driver, 2)
 
         boton_cambiar_contrasena = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located(
@@ -455,7 +1979,7 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
             )
         )
         driver.execute_script("arguments[0].click();", boton_cambiar_contrasena)
-        time.sleep(1)
+        _esperar(driver, 1, ajax=False)
 
         input_nueva_contrasena = WebDriverWait(driver, 10).until(
             EC.visibility_of_element_located((By.XPATH, '//*[@id="ChangePasswordNew1"]'))
@@ -470,7 +1994,11 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
         input_confirmar_contrasena.send_keys(nueva_contrasena)
 
         driver.find_element(By.XPATH, '//*[@id="ModalChangePasswordSubmit"]').click()
-        time.sleep(2)
+        _esperar(
+            driver,
+            2,
+            EC.invisibility_of_element_located((By.XPATH, '//*[@id="ChangePasswordNew1"]')),
+        )
 
         print(f"✅ Contraseña de {nombre_usuario} cambiada exitosamente.")
         return True
@@ -479,15 +2007,25 @@ def cambiar_contrasena_blueday(driver, nombre_usuario: str, nueva_contrasena: st
         return False
 
 
-def desbloquear_usuario_en_blueday(driver, nombre_usuario: str):
+def _fila_actualizada(fila, texto_anterior: str) -> bool:
+    """
+    True si la fila se volvió a dibujar (quedó vieja) o cambió su contenido.
+    """
+    try:
+        return fila.text != texto_anterior
+    except StaleElementReferenceException:
+        return True
+
+
+def desbloquear_usuario_en_blueday(driver, nombre_usuario: str) -> bool:
     try:
         boton_menu = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "/html/body/header/nav/div[1]/a/i"))
         )
         driver.execute_script("arguments[0].scrollIntoView(true);", boton_menu)
-        time.sleep(0.5)
+        _esperar(driver, 0.5, ajax=False)
         driver.execute_script("arguments[0].click();", boton_menu)
-        time.sleep(2)
+        _esperar(driver, 2, ajax=False)
 
         boton_usuarios = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable(
@@ -495,32 +2033,338 @@ def desbloquear_usuario_en_blueday(driver, nombre_usuario: str):
             )
         )
         driver.execute_script("arguments[0].scrollIntoView(true);", boton_usuarios)
-        time.sleep(0.5)
+        _esperar(driver, 0.5, ajax=False)
         driver.execute_script("arguments[0].click();", boton_usuarios)
-        time.sleep(2)
+        # El panel también tiene #UserSearch: esperar un elemento propio de la sección
+        _esperar(
+            driver,
+            2,
+            EC.presence_of_element_located((By.XPATH, '//*[@id="UserSearchButton"]')),
+        )
 
         search_box = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, '//*[@id="UserSearch"]'))
         )
         search_box.clear()
         search_box.send_keys(nombre_usuario)
-        time.sleep(1)
+        _esperar(driver, 1, ajax=False)
         driver.find_element(By.XPATH, '//*[@id="UserSearchButton"]').click()
-        time.sleep(2)
+        _esperar(driver, 2)
 
         boton_desbloquear = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable(
                 (By.XPATH, '//*[@id="users"]/tbody/tr/td[4]/a[4]/i')
             )
         )
+        fila = boton_desbloquear.find_element(By.XPATH, "./ancestor::tr")
+        texto_fila = fila.text
         driver.execute_script("arguments[0].scrollIntoView(true);", boton_desbloquear)
-        time.sleep(0.5)
+        _esperar(driver, 0.5, ajax=False)
         driver.execute_script("arguments[0].click();", boton_desbloquear)
-        time.sleep(2)
+        # BlueDay confirma redibujando la fila: sin esperarlo, el chequeo de
+        # sesión del pool navega y puede cortar el pedido de desbloqueo
+        _esperar(driver, 2, lambda d: _fila_actualizada(fila, texto_fila))
 
         print(f"✅ Usuario '{nombre_usuario}' desbloqueado exitosamente.")
+        return True
     except Exception as e:
         print(f"❌ Error al desbloquear al usuario '{nombre_usuario}': {e}")
+        return False
+
+
+class BackendBlueDay(ABC):
+    """
+    Operaciones de BlueDay que usa el bot. Cada método devuelve True si la
+    operación se hizo y es bloqueante: se llama desde executor_blueday.
+    Un backend al que le falte una operación no se puede instanciar.
+    """
+
+    @abstractmethod
+    def crear_usuario(self, nombre_usuario: str) -> bool:
+        ...
+
+    @abstractmethod
+    def cargar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        ...
+
+    def cargar_fichas_lote(self, trabajos: list) -> list:
+        """
+        Varias cargas [(nombre_usuario, monto)] con un resultado por cada una.
+        """
+        return [self.cargar_fichas(nombre, monto) for nombre, monto in trabajos]
+
+    @abstractmethod
+    def retirar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        ...
+
+    @abstractmethod
+    def cambiar_contrasena(self, nombre_usuario: str, nueva_contrasena: str) -> bool:
+        ...
+
+    @abstractmethod
+    def desbloquear_usuario(self, nombre_usuario: str) -> bool:
+        ...
+
+
+class BackendSelenium(BackendBlueDay):
+    """
+    Opera con los navegadores del pool (las funciones *_en_blueday de arriba).
+    """
+
+    def crear_usuario(self, nombre_usuario: str) -> bool:
+        return ejecutar_en_blueday(crear_usuario_en_blueday, nombre_usuario)
+
+    def cargar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        return ejecutar_en_blueday(cargar_fichas_en_blueday, nombre_usuario, monto)
+
+    def cargar_fichas_lote(self, trabajos: list) -> list:
+        # Un solo navegador (y un solo chequeo de sesión) para toda la tanda
+        resultados = ejecutar_en_blueday(cargar_fichas_en_lote, trabajos)
+        return resultados if resultados else [False] * len(trabajos)
+
+    def retirar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        return ejecutar_en_blueday(retirar_fichas_en_blueday, nombre_usuario, monto)
+
+    def cambiar_contrasena(self, nombre_usuario: str, nueva_contrasena: str) -> bool:
+        return ejecutar_en_blueday(cambiar_contrasena_blueday, nombre_usuario, nueva_contrasena)
+
+    def desbloquear_usuario(self, nombre_usuario: str) -> bool:
+        return ejecutar_en_blueday(desbloquear_usuario_en_blueday, nombre_usuario)
+
+
+class SesionExpiradaBlueDay(Exception):
+    pass
+
+
+def cookies_de_selenium() -> str:
+    """
+    Cookies de un navegador logueado del pool, en formato de header Cookie.
+    El pool revisa la sesión antes de entregarlo, así que si expiró se
+    vuelve a loguear y las cookies salen frescas.
+    """
+    with pool_blueday.sesion() as driver:
+        if not driver:
+            raise RuntimeError("No hay navegadores de BlueDay para obtener la sesión")
+        return "; ".join(f"{c['name']}={c['value']}" for c in driver.get_cookies())
+
+
+class BackendHTTP(BackendBlueDay):
+    """
+    Opera contra los endpoints del panel sin abrir el navegador por pedido.
+    Usa una sola sesión HTTP con conexiones reutilizadas (urllib3) y las
+    cookies de un login de Selenium; si el panel responde que la sesión
+    expiró, las renueva una vez y reintenta.
+    """
+
+    def __init__(self, url_base: str, endpoints: dict, obtener_cookies=cookies_de_selenium,
+                 conexiones: int = 10, timeout: float = 15):
+        self.url_base = url_base.rstrip("/")
+        self.endpoints = endpoints
+        self._obtener_cookies = obtener_cookies
+        self._cookies = None
+        self._lock = threading.Lock()
+        self._http = urllib3.PoolManager(
+            maxsize=conexiones,
+            block=True,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,
+        )
+
+    def _renovar_cookies(self, vencidas=None) -> str:
+        with self._lock:
+            # Si otro hilo ya las renovó mientras esperábamos, se usan esas
+            if self._cookies is None or self._cookies == vencidas:
+                self._cookies = self._obtener_cookies()
+            return self._cookies
+
+    def _pedir_una_vez(self, metodo: str, operacion: str, campos: dict, cookies: str) -> dict:
+        headers = {"Cookie": cookies, "X-Requested-With": "XMLHttpRequest"}
+        if metodo == "GET":
+            cuerpo = {"fields": campos}
+        else:
+            cuerpo = {"body": urlencode(campos)}
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        respuesta = self._http.request(
+            metodo,
+            self.url_base + self.endpoints[operacion],
+            headers=headers,
+            redirect=False,
+            **cuerpo,
+        )
+        # El panel manda al login (o rechaza) cuando la sesión venció
+        if respuesta.status in (301, 302, 303, 401, 403):
+            raise SesionExpiradaBlueDay(respuesta.status)
+        if respuesta.status >= 400:
+            raise RuntimeError(f"HTTP {respuesta.status} en {operacion}")
+        return json.loads(respuesta.data or b"{}")
+
+    def _pedir(self, metodo: str, operacion: str, **campos) -> dict:
+        cookies = self._cookies or self._renovar_cookies()
+        try:
+            return self._pedir_una_vez(metodo, operacion, campos, cookies)
+        except SesionExpiradaBlueDay:
+            print("🔁 Sesión HTTP de BlueDay expirada. Renovando cookies...")
+            cookies = self._renovar_cookies(vencidas=cookies)
+            return self._pedir_una_vez(metodo, operacion, campos, cookies)
+
+    def _operar(self, descripcion: str, metodo: str, operacion: str, **campos) -> bool:
+        try:
+            datos = self._pedir(metodo, operacion, **campos)
+            if not datos.get("ok"):
+                print(f"❌ BlueDay rechazó {descripcion}: {datos.get('error')}")
+                return False
+            return True
+        except Exception as e:
+            print(f"❌ Error HTTP al {descripcion}: {e}")
+            return False
+
+    def saldo(self, nombre_usuario: str):
+        datos = self._pedir("GET", "buscar_usuario", username=nombre_usuario)
+        for usuario in datos.get("users", []):
+            if usuario.get("username") == nombre_usuario:
+                return float(usuario.get("balance", 0))
+        return None
+
+    def crear_usuario(self, nombre_usuario: str) -> bool:
+        if not self._operar(
+            "crear usuario", "POST", "crear_usuario", username=nombre_usuario, password="abc123"
+        ):
+            return False
+        print(f"✅ Usuario {nombre_usuario} creado correctamente en BlueDay.")
+        return True
+
+    def cargar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        if float(monto) <= 0:
+            print("❌ Error: el monto es inválido o cero.")
+            return False
+        if not self._operar(
+            "cargar fichas", "POST", "cargar_fichas", username=nombre_usuario, amount=str(monto)
+        ):
+            return False
+        print(f"✅ Se han cargado {monto} fichas a {nombre_usuario}.")
+        return True
+
+    def retirar_fichas(self, nombre_usuario: str, monto: float) -> bool:
+        try:
+            saldo = self.saldo(nombre_usuario)
+        except Exception as e:
+            print(f"❌ Error HTTP al consultar saldo de {nombre_usuario}: {e}")
+            return False
+        if saldo is None:
+            print(f"❌ BlueDay no encontró al usuario '{nombre_usuario}'.")
+            return False
+        if float(monto) > saldo:
+            print(f"❌ Saldo insuficiente. Disponible: {saldo}, solicitado: {monto}")
+            return False
+
+        if not self._operar(
+            "retirar fichas", "POST", "retirar_fichas", username=nombre_usuario, amount=str(monto)
+        ):
+            return False
+        print(f"✅ Se han retirado {monto} fichas de {nombre_usuario}.")
+        return True
+
+    def cambiar_contrasena(self, nombre_usuario: str, nueva_contrasena: str) -> bool:
+        if not self._operar(
+            "cambiar la contraseña", "POST", "cambiar_contrasena",
+            username=nombre_usuario, password=nueva_contrasena,
+        ):
+            return False
+        print(f"✅ Contraseña de {nombre_usuario} cambiada exitosamente.")
+        return True
+
+    def desbloquear_usuario(self, nombre_usuario: str) -> bool:
+        if not self._operar(
+            "desbloquear usuario", "POST", "desbloquear_usuario", username=nombre_usuario
+        ):
+            return False
+        print(f"✅ Usuario '{nombre_usuario}' desbloqueado exitosamente.")
+        return True
+
+
+def crear_backend_blueday() -> BackendBlueDay:
+    if BLUEDAY_BACKEND == "http":
+        return BackendHTTP(
+            URL_BLUEDAY,
+            ENDPOINTS_BLUEDAY_HTTP,
+            conexiones=BLUEDAY_WORKERS,
+            timeout=BLUEDAY_HTTP_TIMEOUT,
+        )
+    return BackendSelenium()
+
+
+backend_blueday = crear_backend_blueday()
+
+
+class AgrupadorCargas:
+    """
+    Junta las cargas de fichas mientras todos los navegadores están ocupados
+    (hasta una ventana corta) y las manda como una tanda al executor de
+    BlueDay. Si hay un worker libre, lo juntado sale en el momento: una carga
+    sola no espera la ventana. Cada llamador recibe el resultado de su propia
+    carga; que falle una no corta las demás.
+    """
+
+    def __init__(self, ventana: float, maximo: int):
+        self.ventana = ventana
+        self.maximo = max(1, maximo)
+        self.tandas = 0
+        self.agrupadas = 0
+        self._pendientes = []  # [(nombre_usuario, monto, futuro)]
+        self._temporizador = None
+
+    async def cargar(self, nombre_usuario: str, monto: float) -> bool:
+        if self.ventana <= 0:
+            return await executor_blueday.ejecutar(
+                backend_blueday.cargar_fichas, nombre_usuario, monto
+            )
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendientes.append((nombre_usuario, monto, futuro))
+
+        libre = executor_blueday.pendientes < executor_blueday.workers
+        if libre or len(self._pendientes) >= self.maximo:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.ventana, self._despachar)
+        return await futuro
+
+    def _despachar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+        lote, self._pendientes = self._pendientes, []
+        if not lote:
+            return
+
+        self.tandas += 1
+        self.agrupadas += len(lote)
+        trabajos = [(nombre, monto) for nombre, monto, _ in lote]
+        futuro = executor_blueday.ejecutar(backend_blueday.cargar_fichas_lote, trabajos)
+        futuro.add_done_callback(lambda f: self._repartir(lote, f))
+
+    @staticmethod
+    def _repartir(lote, futuro):
+        if futuro.cancelled():
+            resultados = [False] * len(lote)
+        elif futuro.exception() is not None:
+            print(f"❌ Error en la tanda de cargas: {futuro.exception()}")
+            resultados = [False] * len(lote)
+        else:
+            resultados = futuro.result()
+
+        for (_, _, esperando), exito in zip(lote, resultados):
+            if not esperando.done():
+                esperando.set_result(bool(exito))
+
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+
+agrupador_cargas = AgrupadorCargas(BLUEDAY_LOTE_VENTANA, BLUEDAY_LOTE_MAX)
 
 
 # ============================================================
@@ -549,207 +2393,964 @@ def parsear_monto(monto_str: str):
         return None
 
 
-def eliminar_montos_viejos():
+# Resultado del último vencimiento, para consultarlo desde el bot
+estadisticas_vencimiento = {"eliminados": 0, "segundos": 0.0, "total": 0}
+
+metricas.indicador(
+    "bot_vencimiento_eliminados", "Movimientos borrados en el último vencimiento",
+    lambda: estadisticas_vencimiento["eliminados"],
+)
+metricas.indicador(
+    "bot_vencimiento_segundos", "Duración del último vencimiento de movimientos",
+    lambda: estadisticas_vencimiento["segundos"],
+)
+metricas.indicador(
+    "bot_vencimiento_eliminados_acumulado", "Movimientos borrados por vencimiento desde el arranque",
+    lambda: estadisticas_vencimiento["total"],
+)
+
+
+def eliminar_montos_viejos(ttl: int = MOVIMIENTOS_TTL_SEGUNDOS, lote: int = MOVIMIENTOS_BORRADO_LOTE):
+    """
+    Borra los movimientos con más de ttl segundos en tandas de a `lote` filas
+    (por el índice de creado_en), confirmando cada tanda para no tener
+    bloqueado un rango grande de la tabla. Devuelve (eliminados, segundos).
+    """
+    inicio = time.monotonic()
+    eliminados = 0
+    try:
+        with conexion_mysql() as conn:
+            if not conn:
+                return 0, 0.0
+
+            with conn.cursor() as cursor:
+                while True:
+                    cursor.execute(
+                        """
+                        DELETE FROM movimientos
+                        WHERE creado_en < NOW() - INTERVAL %s SECOND
+                        ORDER BY creado_en
+                        LIMIT %s
+                        """,
+                        (ttl, lote),
+                    )
+                    borradas = cursor.rowcount
+                    conn.commit()
+                    eliminados += borradas
+                    if borradas < lote:
+                        break
+    except Exception as e:
+        print(f"❌ Error al eliminar montos viejos: {e}")
+
+    segundos = time.monotonic() - inicio
+    estadisticas_vencimiento["eliminados"] = eliminados
+    estadisticas_vencimiento["segundos"] = segundos
+    estadisticas_vencimiento["total"] += eliminados
+    if eliminados > 0:
+        print(f"🧹 Se eliminaron {eliminados} montos vencidos en {segundos:.2f}s.")
+    return eliminados, segundos
+
+
+def cargar_movimientos_vigentes() -> list:
+    """
+    Movimientos todavía vigentes con los segundos que les quedan de vigencia,
+    para precargar el índice de depósitos al arrancar.
+    """
+    with conexion_mysql() as conn:
+        if not conn:
+            raise RuntimeError("MySQL no disponible")
+
+        with conn.cursor(dictionary=True) as cursor:
+            cursor.execute(
+                """
+                SELECT cuenta_alias, monto, message_id,
+                       %s - TIMESTAMPDIFF(SECOND, creado_en, NOW()) AS restante
+                FROM movimientos
+                WHERE creado_en >= NOW() - INTERVAL %s SECOND
+                ORDER BY creado_en
+                """,
+                (MOVIMIENTOS_TTL_SEGUNDOS, MOVIMIENTOS_TTL_SEGUNDOS),
+            )
+            return cursor.fetchall()
+
+
+def reclamar_movimiento_en_mysql(message_id: str) -> bool:
+    """
+    Borra el movimiento reclamado. Devuelve True solo si esta llamada fue la
+    que lo borró (rowcount 1): si otro proceso ya lo usó o venció, False.
+    """
+    with conexion_mysql() as conn:
+        if not conn:
+            raise RuntimeError("MySQL no disponible")
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM movimientos
+                WHERE message_id = %s AND creado_en >= NOW() - INTERVAL %s SECOND
+                """,
+                (message_id, MOVIMIENTOS_TTL_SEGUNDOS),
+            )
+            borradas = cursor.rowcount
+        conn.commit()
+    return borradas == 1
+
+
+def _centavos(monto) -> int:
+    return int(round(float(monto) * 100))
+
+
+class IndiceDepositos:
+    """
+    Depósitos sin reclamar en memoria, por (cuenta_alias, monto en centavos).
+    Los lectores de correo lo llenan al guardar cada movimiento y el flujo de
+    carga reclama en O(1). Tomar del índice es atómico (bajo lock) y además
+    se confirma borrando la fila en MySQL, así dos jugadores nunca se quedan
+    con la misma transferencia. Quien espera un depósito se suscribe a su
+    clave y se despierta apenas llega el mail, sin sondear.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.reclamados = 0
+        self.vencidos = 0
+        self._pendientes = {}  # (alias, centavos) -> deque[(message_id, vence_en)]
+        self._suscriptos = {}  # (alias, centavos) -> [(loop, asyncio.Future)]
+        self._lock = threading.Lock()
+
+    def agregar(self, cuenta_alias: str, monto, message_id: str, restante: float = None):
+        clave = (cuenta_alias, _centavos(monto))
+        vence_en = time.monotonic() + (self.ttl if restante is None else restante)
+        with self._lock:
+            self._pendientes.setdefault(clave, deque()).append((message_id, vence_en))
+            suscriptos = self._suscriptos.pop(clave, [])
+
+        # Se despierta a todos: el que gane el reclamo se lo lleva y el resto
+        # vuelve a suscribirse
+        for loop, futuro in suscriptos:
+            loop.call_soon_threadsafe(_despertar, futuro)
+
+    def tomar(self, cuenta_alias: str, monto):
+        """
+        Saca el depósito vigente más viejo para esa cuenta y monto (o None).
+        """
+        clave = (cuenta_alias, _centavos(monto))
+        ahora = time.monotonic()
+        with self._lock:
+            cola = self._pendientes.get(clave)
+            while cola:
+                message_id, vence_en = cola.popleft()
+                if vence_en > ahora:
+                    if not cola:
+                        del self._pendientes[clave]
+                    return message_id
+                self.vencidos += 1
+            self._pendientes.pop(clave, None)
+        return None
+
+    def devolver(self, cuenta_alias: str, monto, message_id: str):
+        """
+        Vuelve a poner adelante un depósito tomado que no se pudo confirmar.
+        """
+        with self._lock:
+            self._pendientes.setdefault(
+                (cuenta_alias, _centavos(monto)), deque()
+            ).appendleft((message_id, time.monotonic() + self.ttl))
+
+    async def reclamar(self, cuenta_alias: str, monto):
+        """
+        Reclama un depósito de ese monto en la cuenta. Devuelve el message_id
+        reclamado o None si no hay ninguno vigente.
+        """
+        while True:
+            message_id = self.tomar(cuenta_alias, monto)
+            if message_id is None:
+                return None
+            try:
+                confirmado = await db_async(reclamar_movimiento_en_mysql, message_id)
+            except BaseException:
+                # También si se cancela: que el depósito no desaparezca del índice
+                self.devolver(cuenta_alias, monto, message_id)
+                raise
+            if confirmado:
+                self.reclamados += 1
+                return message_id
+            # Ya no estaba en la base (vencido o usado por otro proceso): siguiente
+
+    def _suscribir(self, clave):
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        with self._lock:
+            self._suscriptos.setdefault(clave, []).append((loop, futuro))
+        return futuro
+
+    def _desuscribir(self, clave, futuro):
+        with self._lock:
+            suscriptos = [s for s in self._suscriptos.get(clave, []) if s[1] is not futuro]
+            if suscriptos:
+                self._suscriptos[clave] = suscriptos
+            else:
+                self._suscriptos.pop(clave, None)
+
+    def hay(self, cuenta_alias: str, monto) -> bool:
+        clave = (cuenta_alias, _centavos(monto))
+        ahora = time.monotonic()
+        with self._lock:
+            return any(vence_en > ahora for _, vence_en in self._pendientes.get(clave, ()))
+
+    async def esperar(self, cuenta_alias: str, monto, timeout: float) -> bool:
+        """
+        Espera hasta timeout segundos a que haya un depósito vigente de ese
+        monto en la cuenta, sin reclamarlo. Devuelve True si hay uno.
+        Se puede cancelar sin perder nada: no toca el índice ni la base.
+        """
+        clave = (cuenta_alias, _centavos(monto))
+        limite = time.monotonic() + timeout
+        while True:
+            # Suscribirse antes de mirar: un mail que llega en el medio no se pierde
+            futuro = self._suscribir(clave)
+            try:
+                if self.hay(cuenta_alias, monto):
+                    return True
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(futuro, restante)
+                except asyncio.TimeoutError:
+                    return False
+            finally:
+                self._desuscribir(clave, futuro)
+
+    def esperando(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._suscriptos.values())
+
+    def purgar_vencidos(self) -> int:
+        ahora = time.monotonic()
+        purgados = 0
+        with self._lock:
+            for clave in list(self._pendientes):
+                cola = self._pendientes[clave]
+                while cola and cola[0][1] <= ahora:
+                    cola.popleft()
+                    purgados += 1
+                if not cola:
+                    del self._pendientes[clave]
+        self.vencidos += purgados
+        return purgados
+
+    def precargar(self) -> int:
+        filas = cargar_movimientos_vigentes()
+        for fila in filas:
+            self.agregar(fila["cuenta_alias"], fila["monto"], fila["message_id"], fila["restante"])
+        return len(filas)
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return sum(len(cola) for cola in self._pendientes.values())
+
+    def estadisticas(self) -> dict:
+        return {
+            "pendientes": self.pendientes(),
+            "esperando": self.esperando(),
+            "reclamados": self.reclamados,
+            "vencidos": self.vencidos,
+        }
+
+
+def _despertar(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+indice_depositos = IndiceDepositos(MOVIMIENTOS_TTL_SEGUNDOS)
+
+
+def iniciar_eliminacion_automatica():
+    # Se corre varias veces por período de vigencia, así las tandas son chicas
+    intervalo = min(300, max(5, MOVIMIENTOS_TTL_SEGUNDOS // 10))
+
+    def tarea():
+        while True:
+            eliminar_montos_viejos()
+            indice_depositos.purgar_vencidos()
+            time.sleep(intervalo)
+
+    hilo = threading.Thread(target=tarea, daemon=True)
+    hilo.start()
+
+
+# ============================================================
+# GMAIL (LECTOR ROBUSTO)
+# ============================================================
+
+# Cantidad máxima de mails que se procesan por tanda
+IMAP_LOTE = 20
+
+# Message-IDs recientes que se recuerdan en memoria para no ir a la base
+MAX_MESSAGE_IDS_RECIENTES = 5000
+
+
+class IndiceRecientes:
+    """
+    Conjunto acotado (LRU) y thread-safe de claves vistas recientemente.
+    Al pasar el máximo se olvidan las más viejas; la clave única de la
+    base sigue siendo la garantía final.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._claves: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, clave) -> bool:
+        with self._lock:
+            if clave in self._claves:
+                self._claves.move_to_end(clave)
+                return True
+            return False
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+    def agregar(self, claves):
+        with self._lock:
+            for clave in claves:
+                self._claves[clave] = None
+                self._claves.move_to_end(clave)
+            while len(self._claves) > self.maximo:
+                self._claves.popitem(last=False)
+
+
+message_ids_recientes = IndiceRecientes(MAX_MESSAGE_IDS_RECIENTES)
+
+
+def insertar_movimientos(filas: list) -> list:
+    """
+    Guarda una tanda de movimientos [(monto, message_id, cuenta_alias)] con un
+    único INSERT IGNORE: la clave única sobre message_id descarta los repetidos.
+    Devuelve solo las filas que realmente se insertaron.
+    """
+    filas = list({f[1]: f for f in filas if f[1] not in message_ids_recientes}.values())
+    if not filas:
+        return []
+
+    with conexion_mysql() as conn:
+        if not conn:
+            raise RuntimeError("MySQL no disponible")
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT IGNORE INTO movimientos (monto, message_id, cuenta_alias) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(filas)),
+                [valor for fila in filas for valor in fila],
+            )
+            insertadas = cursor.rowcount
+
+            if insertadas == len(filas):
+                nuevas = filas
+            elif insertadas <= 0:
+                nuevas = []
+            else:
+                # Caso raro (mails ya guardados antes): las filas nuevas son
+                # las que tienen id desde el primero generado por este INSERT
+                cursor.execute(
+                    "SELECT message_id FROM movimientos WHERE id >= %s AND message_id IN ("
+                    + ", ".join(["%s"] * len(filas))
+                    + ")",
+                    [cursor.lastrowid] + [f[1] for f in filas],
+                )
+                ids_nuevos = {row[0] for row in cursor.fetchall()}
+                nuevas = [f for f in filas if f[1] in ids_nuevos]
+        conn.commit()
+
+    message_ids_recientes.agregar(f[1] for f in filas)
+    return nuevas
+
+_ABRE_IMAP = object()
+_CIERRA_IMAP = object()
+_TOKEN_IMAP = re.compile(
+    rb'\(|\)|"((?:[^"\\]|\\.)*)"|\{\d+\}$|([^\s()"\[]+(?:\[[^\]]*\](?:<\d+>)?)?)'
+)
+
+
+def _tokenizar_imap(texto: bytes, tokens: list):
+    for m in _TOKEN_IMAP.finditer(texto):
+        if m.group(0) == b"(":
+            tokens.append(_ABRE_IMAP)
+        elif m.group(0) == b")":
+            tokens.append(_CIERRA_IMAP)
+        elif m.group(1) is not None:
+            tokens.append(re.sub(rb"\\(.)", rb"\1", m.group(1)))
+        elif m.group(2) is not None:
+            tokens.append(None if m.group(2).upper() == b"NIL" else m.group(2))
+        # {n}: el literal llega como elemento aparte de la tupla
+
+
+def parsear_fetch(datos) -> list:
+    """
+    Convierte la respuesta de imaplib a un FETCH en una lista de dicts
+    {b"UID": b"12", b"BODYSTRUCTURE": [...], b"BODY[1]": b"...", ...}.
+    """
+    tokens = []
+    for item in datos:
+        if isinstance(item, tuple):
+            _tokenizar_imap(item[0], tokens)
+            tokens.append(item[1])
+        elif item:
+            _tokenizar_imap(item, tokens)
+
+    pos = 0
+
+    def lista():
+        nonlocal pos
+        resultado = []
+        while pos < len(tokens):
+            token = tokens[pos]
+            pos += 1
+            if token is _CIERRA_IMAP:
+                break
+            resultado.append(lista() if token is _ABRE_IMAP else token)
+        return resultado
+
+    respuestas = []
+    while pos < len(tokens):
+        token = tokens[pos]
+        pos += 1
+        if token is _ABRE_IMAP:
+            items = lista()
+            respuestas.append(
+                {
+                    items[i].upper(): items[i + 1]
+                    for i in range(0, len(items) - 1, 2)
+                    if isinstance(items[i], bytes)
+                }
+            )
+    return respuestas
+
+
+def _seccion_body(respuesta: dict):
+    for clave, valor in respuesta.items():
+        if clave.startswith(b"BODY["):
+            return valor
+    return None
+
+
+def buscar_texto_plano(estructura, seccion: str = ""):
+    """
+    Recorre un BODYSTRUCTURE y devuelve (sección, encoding, charset) de la parte
+    de la que se saca el texto: la última text/plain si el mail es multipart,
+    o el cuerpo entero si no lo es (igual que antes con msg.walk()).
+    """
+    if not isinstance(estructura, list) or not estructura:
+        return None
+
+    if isinstance(estructura[0], list):
+        encontrada = None
+        for i, parte in enumerate(estructura, start=1):
+            if not isinstance(parte, list):
+                break
+            sub = buscar_texto_plano(parte, f"{seccion}.{i}" if seccion else str(i))
+            if sub and (isinstance(parte[0], list) or _es_texto_plano(parte)):
+                encontrada = sub
+        return encontrada
+
+    parametros = estructura[2] if isinstance(estructura[2], list) else []
+    charset = None
+    for clave, valor in zip(parametros[::2], parametros[1::2]):
+        if clave.upper() == b"CHARSET" and valor:
+            charset = valor.decode("ascii", errors="ignore")
+    encoding = (estructura[5] or b"7BIT").upper() if len(estructura) > 5 else b"7BIT"
+    return (seccion or "1", encoding, charset)
+
+
+def _es_texto_plano(parte: list) -> bool:
+    return (
+        isinstance(parte[0], bytes)
+        and parte[0].lower() == b"text"
+        and isinstance(parte[1], bytes)
+        and parte[1].lower() == b"plain"
+    )
+
+
+def decodificar_parte(crudo: bytes, encoding: bytes, charset) -> str:
+    if not crudo:
+        return ""
     try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return
+        if encoding == b"BASE64":
+            crudo = base64.b64decode(crudo)
+        elif encoding == b"QUOTED-PRINTABLE":
+            crudo = quopri.decodestring(crudo)
+    except Exception:
+        return ""
+    try:
+        return crudo.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return crudo.decode("utf-8", errors="ignore")
 
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            DELETE FROM movimientos
-            WHERE creado_en < NOW() - INTERVAL 10 MINUTE
-            """
-        )
-        eliminados = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
 
-        if eliminados > 0:
-            print(f"🧹 Se eliminaron {eliminados} montos vencidos.")
-    except Exception as e:
-        print(f"❌ Error al eliminar montos viejos: {e}")
+async def leer_lote_imap(imap: ClienteIMAPAsync, uids: list) -> list:
+    """
+    Trae de cada mail solo el Message-ID y la parte de texto: un FETCH de
+    encabezado + BODYSTRUCTURE para todo el lote y uno por sección de texto
+    (los mails con la misma estructura se piden juntos). De los multipart
+    nunca baja adjuntos ni la parte HTML, y BODY.PEEK no marca los mails como
+    leídos.
+    Devuelve [(uid, message_id, cuerpo)] ordenado por UID.
+    """
+    datos = await imap.uid_fetch(
+        uids, "(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])"
+    )
+    mensajes = {}
+    por_seccion = {}
+    for respuesta in parsear_fetch(datos):
+        if b"UID" not in respuesta:
+            continue
+        uid = int(respuesta[b"UID"])
+        encabezado = email.message_from_bytes(_seccion_body(respuesta) or b"")
+        message_id = encabezado.get("Message-ID")
+        mensajes[uid] = [message_id, ""]
+
+        parte = buscar_texto_plano(respuesta.get(b"BODYSTRUCTURE"))
+        if message_id and parte:
+            por_seccion.setdefault(parte[0], {})[uid] = parte
+
+    for seccion, partes in por_seccion.items():
+        datos = await imap.uid_fetch(partes, f"(UID BODY.PEEK[{seccion}])")
+        for respuesta in parsear_fetch(datos):
+            uid = int(respuesta.get(b"UID") or 0)
+            if uid not in partes:
+                continue
+            _, encoding, charset = partes[uid]
+            mensajes[uid][1] = decodificar_parte(_seccion_body(respuesta), encoding, charset)
 
+    return [(uid, m[0], m[1]) for uid, m in sorted(mensajes.items())]
 
-def iniciar_eliminacion_automatica():
-    def tarea():
-        while True:
-            eliminar_montos_viejos()
-            time.sleep(300)
 
-    hilo = threading.Thread(target=tarea, daemon=True)
-    hilo.start()
+def cargar_estado_imap(alias: str):
+    """
+    Devuelve (uidvalidity, ultimo_uid) guardados para la cuenta, o None.
+    """
+    with conexion_mysql() as conn:
+        if not conn:
+            raise RuntimeError("MySQL no disponible")
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT uidvalidity, ultimo_uid FROM imap_estado WHERE cuenta_alias = %s",
+                (alias,),
+            )
+            return cursor.fetchone()
 
 
-# ============================================================
-# GMAIL (LECTOR ROBUSTO)
-# ============================================================
+def guardar_estado_imap(alias: str, uidvalidity: int, ultimo_uid: int):
+    with conexion_mysql() as conn:
+        if not conn:
+            raise RuntimeError("MySQL no disponible")
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO imap_estado (cuenta_alias, uidvalidity, ultimo_uid)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    uidvalidity = VALUES(uidvalidity),
+                    ultimo_uid = VALUES(ultimo_uid)
+                """,
+                (alias, uidvalidity, ultimo_uid),
+            )
+        conn.commit()
+
 
-def extraer_y_guardar_montos_por_cuenta(cuenta: dict):
+async def ultimo_uid_vencido(imap: ClienteIMAPAsync, uidnext: int) -> int:
     """
-    Versión simplificada: extrae montos de mails y los guarda en la tabla 'movimientos'.
-    'cuenta' debe tener 'email', 'password', 'alias'.
+    Entre los últimos IMAP_LOTE mails del buzón, el UID más alto de los que
+    llegaron antes de la vigencia de los movimientos (o sin fecha legible).
+    Esos ya no se pueden reclamar: registrarlos de nuevo solo avisaría a caja
+    de ingresos viejos y los dejaría reclamables otra vez.
     """
-    try:
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
-        mail.login(cuenta["email"], cuenta["password"])
-        mail.select("inbox")
+    desde = max(1, uidnext - IMAP_LOTE)
+    uids = sorted(u for u in await imap.uid_search(f"UID {desde}:*") if u >= desde)[-IMAP_LOTE:]
+    if not uids:
+        return max(0, uidnext - 1)
+
+    limite = time.time() - MOVIMIENTOS_TTL_SEGUNDOS
+    vencido = uids[0] - 1
+    for respuesta in parsear_fetch(await imap.uid_fetch(uids, "(UID INTERNALDATE)")):
+        try:
+            uid = int(respuesta[b"UID"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        try:
+            llegada = datetime.strptime(
+                respuesta[b"INTERNALDATE"].decode().strip(), "%d-%b-%Y %H:%M:%S %z"
+            ).timestamp()
+        except (KeyError, AttributeError, ValueError):
+            llegada = 0
+        if llegada < limite:
+            vencido = max(vencido, uid)
+    return vencido
 
-        status, messages = mail.search(None, "UNSEEN")
-        email_ids = messages[0].split()
 
-        for email_id in reversed(email_ids[-20:]):
-            status, data = mail.fetch(email_id, "(RFC822)")
-            raw_email = data[0][1]
-            msg = email.message_from_bytes(raw_email)
+async def preparar_estado_uid(imap: ClienteIMAPAsync, alias: str) -> dict:
+    """
+    Se llama justo después del SELECT. Si UIDVALIDITY cambió (o es la primera
+    vez que se lee la cuenta) los UIDs viejos no sirven: de los últimos
+    IMAP_LOTE mails del buzón solo se leen los que siguen vigentes.
+    """
+    uidvalidity = imap.buzon.get("UIDVALIDITY", 0)
+    uidnext = imap.buzon.get("UIDNEXT", 0)
 
-            message_id = msg.get("Message-ID")
-            if not message_id:
-                mail.store(email_id, "+FLAGS", "\\Seen")
-                continue
+    guardado = await db_async(cargar_estado_imap, alias)
+    if guardado and int(guardado[0]) == uidvalidity:
+        return {"uidvalidity": uidvalidity, "ultimo_uid": int(guardado[1]), "nuevo": False}
 
-            conn = mysql_connect_safe()
-            if not conn:
-                mail.store(email_id, "+FLAGS", "\\Seen")
-                continue
+    if guardado:
+        print(f"[IMAP] {alias}: cambió UIDVALIDITY, se relee el final del buzón.")
+    return {
+        "uidvalidity": uidvalidity,
+        "ultimo_uid": await ultimo_uid_vencido(imap, uidnext),
+        "nuevo": True,
+    }
 
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id FROM movimientos WHERE message_id = %s", (message_id,)
-            )
-            if cursor.fetchone():
-                mail.store(email_id, "+FLAGS", "\\Seen")
-                cursor.close()
-                conn.close()
-                continue
 
-            cuerpo = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        cuerpo = part.get_payload(decode=True).decode(
-                            "utf-8", errors="ignore"
-                        )
-            else:
-                cuerpo = msg.get_payload(decode=True).decode(
-                    "utf-8", errors="ignore"
-                )
+async def procesar_mails_nuevos(imap: ClienteIMAPAsync, cuenta: dict, estado: dict) -> int:
+    """
+    Extrae montos de los mails con UID mayor al último procesado y los guarda
+    en la tabla 'movimientos'. Avanza y persiste el último UID por tanda.
+    Devuelve cuántos mails revisó. 'cuenta' debe tener 'alias'.
+    """
+    revisados = 0
+    while True:
+        uids = await imap.uid_search(f"UID {estado['ultimo_uid'] + 1}:*")
+        # "n:*" devuelve igual el último mail aunque sea viejo: filtrar
+        uids = sorted(u for u in uids if u > estado["ultimo_uid"])
+        if estado["nuevo"]:
+            uids = uids[-IMAP_LOTE:]
+            estado["nuevo"] = False
+        if not uids:
+            return revisados
+
+        lote = uids[:IMAP_LOTE]
+        filas = []
+        for uid, message_id, cuerpo in await leer_lote_imap(imap, lote):
+            revisados += 1
+            if not message_id or message_id in message_ids_recientes:
+                continue
 
             match = re.search(
                 r"acreditados?\s\$?\s*([\d.,]+)", cuerpo, re.IGNORECASE
             )
             if not match:
-                mail.store(email_id, "+FLAGS", "\\Seen")
-                cursor.close()
-                conn.close()
                 continue
 
             monto_crudo = match.group(1)
             monto_decimal = parsear_monto(monto_crudo)
             if monto_decimal is None:
-                mail.store(email_id, "+FLAGS", "\\Seen")
-                cursor.close()
-                conn.close()
                 continue
 
-            cursor.execute(
-                """
-                INSERT INTO movimientos (monto, message_id, cuenta_alias)
-                VALUES (%s, %s, %s)
-                """,
-                (monto_decimal, message_id, cuenta["alias"]),
-            )
-            conn.commit()
+            filas.append((monto_decimal, message_id, cuenta["alias"]))
 
-            print(f"[{cuenta['alias']}] Monto registrado: {monto_decimal}")
+        for monto_decimal, message_id, alias in await db_async(insertar_movimientos, filas):
+            print(f"[{alias}] Monto registrado: {monto_decimal}")
+            indice_depositos.agregar(alias, monto_decimal, message_id)
 
-            mensaje_caja = (
-                f"💰 Ingreso detectado en {cuenta['alias']}:\n${monto_decimal:,.2f}"
-            )
-            cola_mensajes.put(mensaje_caja)
+            mensaje_caja = f"💰 Ingreso detectado en {alias}:\n${monto_decimal:,.2f}"
+            notificador_caja.avisar(mensaje_caja)
 
-            cursor.close()
-            conn.close()
-            mail.store(email_id, "+FLAGS", "\\Seen")
+        estado["ultimo_uid"] = lote[-1]
+        await db_async(guardar_estado_imap, cuenta["alias"], estado["uidvalidity"], lote[-1])
 
-        mail.logout()
-    except Exception as e:
-        print(f"❌ Error leyendo Gmail en {cuenta.get('alias')}: {e}")
 
+class LectorCuenta:
+    """
+    Lector de una cuenta con conexión IMAP persistente: procesa lo pendiente
+    y después solo vuelve a buscar cuando el servidor avisa que llegó un mail
+    (IDLE, o NOOP periódico si el servidor no lo soporta).
+    Si la conexión se cae, se reconecta.
+    """
+
+    def __init__(self, cuenta: dict, logins: "asyncio.Semaphore"):
+        self.cuenta = cuenta
+        self.alias = cuenta.get("alias", "desconocido")
+        self.tarea = None
+        self.estado = "iniciando"
+        self.procesados = 0
+        self.errores = 0
+        self.ultimo_error = None
+        self._logins = logins
+        self._al_dia = time.monotonic()
+
+    def is_alive(self) -> bool:
+        return self.tarea is not None and not self.tarea.done()
+
+    def atraso(self) -> float:
+        """
+        Segundos de atraso respecto del buzón: 0 mientras se están esperando
+        avisos del servidor; si no, tiempo desde la última vez que estuvo al día.
+        """
+        if self.estado == "esperando":
+            return 0.0
+        return time.monotonic() - self._al_dia
+
+    def iniciar(self):
+        self.tarea = asyncio.get_running_loop().create_task(self.correr())
+
+    async def detener(self):
+        if self.tarea:
+            self.tarea.cancel()
+            try:
+                await self.tarea
+            except BaseException:
+                pass
 
-def extraer_y_guardar_montos_por_cuenta_con_reintento(cuenta: dict):
-    alias = cuenta.get("alias", "desconocido")
-    while True:
-        try:
-            extraer_y_guardar_montos_por_cuenta(cuenta)
-        except OSError as e:
-            print(f"⚠️ Error de red con {alias}: {e}. Reintentando en 60 segundos...")
-            time.sleep(60)
-            continue
-        except Exception as e:
-            print(f"❌ Error general en {alias}: {e}. Reintentando en 60 segundos...")
-            time.sleep(60)
-            continue
+    async def _procesar(self, imap: ClienteIMAPAsync, estado_uid: dict):
+        self.estado = "procesando"
+        self.procesados += await procesar_mails_nuevos(imap, self.cuenta, estado_uid)
 
+    async def correr(self):
+        while True:
+            self.estado = "conectando"
+            imap = await imap_connect_safe(
+                self.cuenta["email"], self.cuenta["password"], self._logins
+            )
+            if not imap:
+                continue
 
-async def procesar_cola():
+            usa_idle = b"IDLE" in imap.capacidades
+            if not usa_idle:
+                print(f"[IMAP] {self.alias}: el servidor no soporta IDLE, se usa NOOP.")
+
+            try:
+                estado_uid = await preparar_estado_uid(imap, self.alias)
+                await self._procesar(imap, estado_uid)
+                while True:
+                    self.estado = "esperando"
+                    self._al_dia = time.monotonic()
+                    if usa_idle:
+                        hay_novedades = await imap.idle(IMAP_IDLE_SEGUNDOS)
+                    else:
+                        await asyncio.sleep(IMAP_NOOP_SEGUNDOS)
+                        hay_novedades = await imap.noop()
+                    if hay_novedades:
+                        self._al_dia = time.monotonic()
+                        await self._procesar(imap, estado_uid)
+            except (ErrorIMAP, OSError, ConnectionError, asyncio.TimeoutError) as e:
+                self.errores += 1
+                self.ultimo_error = str(e)
+                print(f"⚠️ Conexión IMAP perdida con {self.alias}: {e}. Reconectando...")
+            except Exception as e:
+                self.errores += 1
+                self.ultimo_error = str(e)
+                print(f"❌ Error general en {self.alias}: {e}. Reintentando en 60 segundos...")
+                self.estado = "error"
+                await asyncio.sleep(60)
+            finally:
+                await imap.logout()
+
+
+class MotorCorreo:
     """
-    Envía mensajes encolados al grupo de caja.
+    Servicio único de lectura de correos: los lectores de todas las cuentas
+    corren como tareas en el loop del bot (sin un hilo ni un loop por cuenta)
+    y un semáforo acota cuántos logins IMAP se hacen a la vez.
     """
-    while True:
-        while not cola_mensajes.empty():
-            msg = cola_mensajes.get()
+
+    def __init__(self, lectores: dict, max_logins: int):
+        self.lectores = lectores
+        self.max_logins = max_logins
+        self.loop = None
+        self._logins = None
+        self._pendiente = None
+
+    def iniciar(self, loop):
+        self.loop = loop
+        self._logins = asyncio.Semaphore(self.max_logins)
+        if self._pendiente is not None:
+            cuentas, self._pendiente = self._pendiente, None
+            loop.create_task(self.sincronizar(cuentas))
+
+    def programar_sincronizacion(self, cuentas: list):
+        """
+        Pide sincronizar los lectores con la lista de cuentas.
+        Se puede llamar desde cualquier hilo; si el loop todavía no arrancó,
+        queda pendiente hasta iniciar().
+        """
+        if self.loop is None:
+            self._pendiente = cuentas
+            return
+        asyncio.run_coroutine_threadsafe(self.sincronizar(cuentas), self.loop)
+
+    async def sincronizar(self, cuentas: list):
+        nuevas = {c["alias"]: c for c in cuentas}
+
+        for alias, lector in list(self.lectores.items()):
+            if nuevas.get(alias) != lector.cuenta or not lector.is_alive():
+                await lector.detener()
+                del self.lectores[alias]
+                print(f"🔴 Lector detenido para {alias}")
+
+        for alias, cuenta in nuevas.items():
+            if alias not in self.lectores:
+                lector = LectorCuenta(cuenta, self._logins)
+                lector.iniciar()
+                self.lectores[alias] = lector
+                print(f"🟢 Lector iniciado para {alias}")
+
+    def estado(self) -> list:
+        return [
+            {
+                "alias": alias,
+                "vivo": lector.is_alive(),
+                "estado": lector.estado,
+                "atraso": lector.atraso(),
+                "procesados": lector.procesados,
+                "errores": lector.errores,
+                "ultimo_error": lector.ultimo_error,
+            }
+            for alias, lector in self.lectores.items()
+        ]
+
+
+motor_correo = MotorCorreo(hilos_activos, IMAP_MAX_LOGINS)
+
+metricas.indicador(
+    "bot_correo_atraso_segundos", "Atraso de cada lector de correo respecto de su buzón",
+    lambda: {(e["alias"],): e["atraso"] for e in motor_correo.estado()},
+    ("cuenta",),
+)
+
+
+class NotificadorCaja:
+    """
+    Avisos al grupo de caja. Cualquier hilo puede encolar con avisar() y el loop
+    se despierta en el momento, sin polling. Los avisos que llegan dentro de una
+    ventana corta salen juntos en un solo mensaje, y ante un FloodWait se espera
+    lo que pide Telegram y se reintenta sin perder el aviso.
+    """
+
+    # Reintentos ante errores que no son FloodWait (chat inválido, red, etc.)
+    MAX_REINTENTOS = 5
+
+    def __init__(self, ventana: float, maximo: int):
+        self.ventana = ventana
+        self.maximo = max(1, maximo)
+        self.loop = None
+        self.enviados = 0
+        self.perdidos = 0
+        self._cola = None
+        self._previos = []
+        self._en_vuelo = 0
+        self._lock = threading.Lock()
+
+    def iniciar(self, loop):
+        with self._lock:
+            self.loop = loop
+            self._cola = asyncio.Queue()
+            for mensaje in self._previos:
+                self._cola.put_nowait(mensaje)
+            self._previos.clear()
+
+    def avisar(self, mensaje: str):
+        """
+        Encola un aviso. Thread-safe: se puede llamar desde hilos o desde el loop.
+        """
+        with self._lock:
+            if self.loop is None:
+                self._previos.append(mensaje)
+                return
+        self.loop.call_soon_threadsafe(self._cola.put_nowait, mensaje)
+
+    def pendientes(self) -> int:
+        """Avisos que todavía no llegaron al grupo."""
+        en_cola = self._cola.qsize() if self._cola else 0
+        return en_cola + len(self._previos) + self._en_vuelo
+
+    async def _juntar(self) -> list:
+        loop = asyncio.get_running_loop()
+        lote = [await self._cola.get()]
+        fin = loop.time() + self.ventana
+        while len(lote) < self.maximo:
+            restante = fin - loop.time()
+            if restante <= 0:
+                break
             try:
-                await client.send_message(GRUPO_CAJA, msg)
-                print(f"[CAJA] Aviso enviado: {msg}")
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _enviar(self, lote: list):
+        texto = "\n\n".join(lote)
+        intentos = 0
+        while True:
+            try:
+                with tiempos_caja.medir():
+                    await client.send_message(GRUPO_CAJA, texto)
+                self.enviados += len(lote)
+                avisos_caja.inc(len(lote), resultado="enviado")
+                print(f"[CAJA] Aviso enviado ({len(lote)} ingresos): {texto}")
+                return
+            except errors.FloodWaitError as e:
+                print(f"⏳ [CAJA] FloodWait de Telegram: reintento en {e.seconds} s.")
+                await asyncio.sleep(e.seconds + 1)
             except Exception as e:
-                print(f"❌ Error enviando al grupo: {e}")
-        await asyncio.sleep(2)
+                intentos += 1
+                if intentos >= self.MAX_REINTENTOS:
+                    self.perdidos += len(lote)
+                    avisos_caja.inc(len(lote), resultado="perdido")
+                    print(f"❌ Error enviando al grupo, aviso descartado: {e}\n{texto}")
+                    return
+                print(f"❌ Error enviando al grupo: {e}. Reintento {intentos}/{self.MAX_REINTENTOS}")
+                await asyncio.sleep(min(60, 2 ** intentos))
+
+    async def procesar(self):
+        while True:
+            lote = await self._juntar()
+            self._en_vuelo = len(lote)
+            try:
+                await self._enviar(lote)
+            finally:
+                self._en_vuelo = 0
+
+
+notificador_caja = NotificadorCaja(CAJA_VENTANA_SEGUNDOS, CAJA_MAX_POR_MENSAJE)
+
+metricas.indicador(
+    "bot_caja_pendientes", "Avisos de caja que todavía no llegaron al grupo",
+    lambda: notificador_caja.pendientes(),
+)
+
+
+async def procesar_cola():
+    """
+    Envía los avisos encolados al grupo de caja.
+    """
+    await notificador_caja.procesar()
 
 
 def iniciar_extraccion_automatica():
     """
-    Levanta hilos para cada cuenta activa en 'cuentas_claro'.
+    Lee las cuentas activas de 'cuentas_claro' y sincroniza los lectores del
+    motor de correo. Se puede llamar desde cualquier hilo.
     """
-    global hilos_activos
     try:
-        # limpiar hilos viejos
-        for alias, hilo in list(hilos_activos.items()):
-            if hilo.is_alive():
-                print(f"[INFO] Hilo previo sigue activo: {alias}")
-        hilos_activos.clear()
-
-        conn = mysql_connect_safe()
-        if not conn:
-            print("[ERROR] No hay conexión MySQL para cuentas_claro.")
-            return
+        with conexion_mysql() as conn:
+            if not conn:
+                print("[ERROR] No hay conexión MySQL para cuentas_claro.")
+                return
 
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT alias, email, password FROM cuentas_claro WHERE activo = 1"
-        )
-        cuentas = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    "SELECT alias, email, password FROM cuentas_claro WHERE activo = 1"
+                )
+                cuentas = cursor.fetchall()
 
         if not cuentas:
             print("[WARN] No hay cuentas activas.")
-            return
 
         print(f"[INFO] Iniciando extracción para {len(cuentas)} cuentas...")
-
-        for cuenta in cuentas:
-            alias = cuenta["alias"]
-            hilo = threading.Thread(
-                target=extraer_y_guardar_montos_por_cuenta_con_reintento,
-                args=(cuenta,),
-                daemon=True,
-            )
-            hilo.start()
-            hilos_activos[alias] = hilo
-            print(f"🟢 Hilo iniciado para {alias}")
+        motor_correo.programar_sincronizacion(cuentas)
     except Exception as e:
         print(f"[ERROR] No se pudo iniciar el lector automático: {e}")
 
@@ -766,119 +3367,313 @@ def agregar_cuenta(
     password: str,
     titular: str,
 ) -> bool:
-    conn = None
-    cursor = None
     try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return False
-
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO cuentas_claro (alias, alias_banco, cbu, email, password, titular, activo)
-            VALUES (%s, %s, %s, %s, %s, %s, 1)
-            """,
-            (nombre_interno, alias_banco, cbu, email_cuenta, password, titular),
-        )
-        conn.commit()
+        with conexion_mysql() as conn:
+            if not conn:
+                return False
+
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO cuentas_claro (alias, alias_banco, cbu, email, password, titular, activo)
+                    VALUES (%s, %s, %s, %s, %s, %s, 1)
+                    """,
+                    (nombre_interno, alias_banco, cbu, email_cuenta, password, titular),
+                )
+            conn.commit()
 
-        print(f"[INFO] Nueva cuenta agregada: {nombre_interno}. Reiniciando hilos...")
+        rotador_cuentas.invalidar()
+        print(f"[INFO] Nueva cuenta agregada: {nombre_interno}. Actualizando lectores...")
         iniciar_extraccion_automatica()
-        print("[OK] Hilos de lectura reiniciados correctamente.")
+        print("[OK] Lectores de correo actualizados correctamente.")
         return True
     except Exception as e:
-        print(f"[ERROR] No se pudieron reiniciar los hilos: {e}")
+        print(f"[ERROR] No se pudieron actualizar los lectores: {e}")
         return False
-    finally:
-        try:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-        except Exception:
-            pass
 
 
 def borrar_cuenta(alias: str) -> bool:
-    conn = None
-    cursor = None
     try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return False
+        with conexion_mysql() as conn:
+            if not conn:
+                return False
 
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM cuentas_claro WHERE alias = %s", (alias,))
-        filas = cursor.rowcount
-        conn.commit()
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM cuentas_claro WHERE alias = %s", (alias,))
+                filas = cursor.rowcount
+            conn.commit()
+        rotador_cuentas.invalidar()
         return filas > 0
     except Exception as e:
         print(f"❌ Error al borrar cuenta {alias}: {e}")
         return False
-    finally:
-        try:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-        except Exception:
-            pass
 
 
 def listar_cuentas():
     try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return []
-
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT id, alias, alias_banco, cbu, email, password, titular, activo
-            FROM cuentas_claro
-            """
-        )
-        cuentas = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return cuentas
+        with conexion_mysql() as conn:
+            if not conn:
+                return []
+
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute(
+                    """
+                    SELECT id, alias, alias_banco, cbu, email, password, titular, activo
+                    FROM cuentas_claro
+                    """
+                )
+                return cursor.fetchall()
     except Exception as e:
         print(f"❌ Error al listar cuentas: {e}")
         return []
 
 
-def obtener_cuenta_rotativa():
+def _secuencia_ponderada(pesos: list) -> list:
     """
-    Devuelve una cuenta activa en forma "round-robin" según cantidad de movimientos.
+    Orden de índices para un round-robin ponderado "suave" (intercalado):
+    pesos [3, 1] → [0, 0, 1, 0] en lugar de [0, 0, 0, 1].
+    """
+    total = sum(pesos)
+    actuales = [0] * len(pesos)
+    secuencia = []
+    for _ in range(total):
+        for i, peso in enumerate(pesos):
+            actuales[i] += peso
+        elegido = max(range(len(pesos)), key=actuales.__getitem__)
+        actuales[elegido] -= total
+        secuencia.append(elegido)
+    return secuencia
+
+
+class RotadorCuentas:
+    """
+    Rotación de cuentas Claro Pay en memoria: la lista de cuentas activas queda
+    cacheada y cada pedido solo avanza un cursor (O(1), sin ir a la base).
+    Estrategias:
+      - round_robin: una cuenta después de la otra.
+      - ponderada: como round_robin, pero cada cuenta aparece según su 'peso'.
+      - lru: siempre la cuenta que hace más tiempo que no se asigna.
+    El cursor se guarda en 'bot_estado' cada tantas asignaciones, así la
+    rotación sigue donde quedó después de un reinicio.
     """
-    try:
-        conn = mysql_connect_safe()
-        if not conn:
-            return None
 
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM cuentas_claro WHERE activo = 1 ORDER BY id ASC")
-        cuentas = cursor.fetchall()
-        if not cuentas:
-            cursor.close()
-            conn.close()
-            return None
+    ESTRATEGIAS = ("round_robin", "ponderada", "lru")
+
+    def __init__(self, estrategia: str, persistir_cada: int, vigencia: int):
+        if estrategia not in self.ESTRATEGIAS:
+            print(f"⚠️ Estrategia de rotación desconocida '{estrategia}', se usa round_robin.")
+            estrategia = "round_robin"
+        self.estrategia = estrategia
+        self.persistir_cada = max(1, persistir_cada)
+        self.vigencia = vigencia
+        self._lock = threading.Lock()
+        self._cuentas = None
+        self._secuencia = []
+        self._recientes: "OrderedDict" = OrderedDict()
+        self._cargadas_en = 0.0
+        self._cursor = None
+
+    def invalidar(self):
+        """La próxima asignación vuelve a leer las cuentas activas."""
+        with self._lock:
+            self._cuentas = None
+
+    def _cargar(self):
+        with conexion_mysql() as conn:
+            if not conn:
+                raise RuntimeError("MySQL no disponible")
+
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute("SELECT * FROM cuentas_claro WHERE activo = 1 ORDER BY id ASC")
+                cuentas = cursor.fetchall()
 
-        cursor.execute("SELECT COUNT(*) AS total FROM movimientos")
-        total_cargas = cursor.fetchone()["total"]
+        if self._cursor is None:
+            self._cursor = int(leer_estado_bot("rotacion_cursor", 0))
 
-        indice = total_cargas % len(cuentas)
-        cuenta = cuentas[indice]
+        if self.estrategia == "ponderada":
+            self._secuencia = _secuencia_ponderada(
+                [max(1, int(c.get("peso") or 1)) for c in cuentas]
+            )
+        else:
+            self._secuencia = list(range(len(cuentas)))
 
-        cursor.close()
-        conn.close()
+        # LRU: las cuentas nuevas van primero, las que siguen conservan su orden
+        por_alias = {c["alias"]: c for c in cuentas}
+        recientes: "OrderedDict" = OrderedDict(
+            (alias, por_alias[alias]) for alias in por_alias if alias not in self._recientes
+        )
+        for alias in self._recientes:
+            if alias in por_alias:
+                recientes[alias] = por_alias[alias]
+        self._recientes = recientes
+
+        self._cuentas = cuentas
+        self._cargadas_en = time.monotonic()
+
+    def siguiente(self):
+        with self._lock:
+            if self._cuentas is None or time.monotonic() - self._cargadas_en > self.vigencia:
+                self._cargar()
+            if not self._cuentas:
+                return None
+
+            if self.estrategia == "lru":
+                alias, cuenta = next(iter(self._recientes.items()))
+                self._recientes.move_to_end(alias)
+                return cuenta
+
+            cuenta = self._cuentas[self._secuencia[self._cursor % len(self._secuencia)]]
+            self._cursor += 1
+            cursor = self._cursor
+
+        if cursor % self.persistir_cada == 0:
+            guardar_estado_bot("rotacion_cursor", cursor)
         return cuenta
+
+
+rotador_cuentas = RotadorCuentas(
+    ROTACION_ESTRATEGIA, ROTACION_PERSISTIR_CADA, ROTACION_CACHE_SEGUNDOS
+)
+
+
+def obtener_cuenta_rotativa():
+    """
+    Devuelve una cuenta activa según la estrategia de rotación configurada,
+    usando la lista cacheada en memoria.
+    """
+    try:
+        return rotador_cuentas.siguiente()
     except Exception as e:
         print(f"❌ Error en obtener_cuenta_rotativa: {e}")
         return None
 
 
+# ============================================================
+# CARGA DE FICHAS POR DEPÓSITO
+# ============================================================
+
+# Esperas de depósito en curso: telegram_id -> tarea
+esperas_deposito = {}
+
+# Reclamos y cargas en curso por jugador: la espera que llegó hasta ahí ya no se cancela
+depositos_en_curso = {}
+
+
+def _fin_carga(telegram_id: int):
+    restantes = depositos_en_curso.pop(telegram_id, 1) - 1
+    if restantes:
+        depositos_en_curso[telegram_id] = restantes
+
+
+async def _reclamar_y_cargar(telegram_id: int, nombre_usuario: str, cuenta_alias: str, monto: float):
+    """
+    Reclama la transferencia y carga las fichas a nombre_usuario. Devuelve
+    None si otro se la llevó antes; si no, True/False según se hayan
+    cargado las fichas.
+    """
+    if not nombre_usuario:
+        # Sin usuario de BlueDay no se gasta la transferencia
+        return False
+
+    message_id = await indice_depositos.reclamar(cuenta_alias, monto)
+    if message_id is None:
+        return None
+
+    # No se pisa con otra operación que el jugador haya pedido mientras tanto
+    with tiempos_operaciones.medir(operacion="cargar_fichas"):
+        async with turnos_jugadores.turno(telegram_id):
+            exito = await agrupador_cargas.cargar(nombre_usuario, monto)
+            if exito:
+                datos = await sesion_de_jugador(telegram_id)
+                if datos is not None:
+                    datos["monto"] = monto
+                    datos["estado"] = "opciones"
+                    await persistencia_usuarios.guardar(telegram_id, datos, inmediato=True)
+
+    if not exito:
+        # El movimiento ya se reclamó: que lo resuelva un operador
+        notificador_caja.avisar(
+            f"⚠️ No se pudieron cargar ${monto:,.2f} a {nombre_usuario} "
+            f"(transferencia {message_id} en {cuenta_alias}). Revisar a mano."
+        )
+        await client.send_message(
+            telegram_id,
+            "❌ Recibimos tu transferencia pero no pudimos cargar las fichas. "
+            "Un operador lo va a resolver enseguida.",
+        )
+        return False
+
+    await client.send_message(
+        telegram_id, f"✅ ¡Listo! Se cargaron ${monto:,.2f} en fichas a {nombre_usuario}."
+    )
+    return True
+
+
+async def acreditar_deposito(
+    telegram_id: int, nombre_usuario: str, cuenta_alias: str, monto: float
+) -> bool:
+    """
+    Espera la transferencia del jugador a la cuenta indicada y, apenas el
+    lector de correo la registra, carga las fichas a su usuario de BlueDay
+    (el que tenía al confirmar el monto). Avisa al jugador del resultado y
+    devuelve True si se acreditó.
+    Solo la espera se puede cancelar: una vez que empieza el reclamo, el
+    reclamo y la carga terminan aunque se cancele la tarea.
+    """
+    if not nombre_usuario:
+        print(f"⚠️ El jugador {telegram_id} confirmó un depósito sin usuario de BlueDay.")
+        await client.send_message(
+            telegram_id,
+            "❌ Todavía no tenés un usuario creado. Escribí *menu* para empezar.",
+        )
+        return False
+
+    limite = time.monotonic() + DEPOSITO_ESPERA_SEGUNDOS
+    while True:
+        if not await indice_depositos.esperar(cuenta_alias, monto, limite - time.monotonic()):
+            await client.send_message(
+                telegram_id,
+                "⌛ Todavía no vimos tu transferencia. "
+                "Si ya la hiciste, escribí *menu* y contactate con una persona real.",
+            )
+            return False
+
+        carga = asyncio.ensure_future(
+            _reclamar_y_cargar(telegram_id, nombre_usuario, cuenta_alias, monto)
+        )
+        depositos_en_curso[telegram_id] = depositos_en_curso.get(telegram_id, 0) + 1
+        carga.add_done_callback(lambda _: _fin_carga(telegram_id))
+        resultado = await asyncio.shield(carga)
+        if resultado is not None:
+            return resultado
+        # Otro jugador se llevó esa transferencia: se sigue esperando
+
+
+def iniciar_espera_deposito(
+    telegram_id: int, nombre_usuario: str, cuenta_alias: str, monto: float
+):
+    """
+    Lanza la espera del depósito sin frenar el handler, con el usuario de
+    BlueDay de la sesión que confirmó el monto. Si el jugador ya
+    tenía una espera en curso, se reemplaza; pero si esa ya está reclamando
+    su transferencia se la deja terminar y la nueva espera corre aparte.
+    """
+    anterior = esperas_deposito.pop(telegram_id, None)
+    if anterior and not anterior.done() and telegram_id not in depositos_en_curso:
+        anterior.cancel()
+
+    tarea = asyncio.get_running_loop().create_task(
+        acreditar_deposito(telegram_id, nombre_usuario, cuenta_alias, monto)
+    )
+    esperas_deposito[telegram_id] = tarea
+    tarea.add_done_callback(
+        lambda t: esperas_deposito.pop(telegram_id, None)
+        if esperas_deposito.get(telegram_id) is t
+        else None
+    )
+    return tarea
+
+
 # ============================================================
 # HANDLER DE TELEGRAM (USUARIOS)
 # ============================================================
@@ -893,12 +3688,20 @@ def obtener_mensaje_wplink() -> str:
 
 @client.on(events.NewMessage(incoming=True))
 async def handler(event):
-    global en_mantenimiento
-
     if event.sender_id == OPERADOR_ID:
         # Lo maneja el admin_handler
         return
 
+    # Los mensajes de un mismo jugador se atienden de a uno y en orden;
+    # los de jugadores distintos, en paralelo
+    with tiempos_handler.medir(handler="jugador"):
+        async with turnos_jugadores.turno(event.sender_id):
+            await atender_jugador(event)
+
+
+async def atender_jugador(event):
+    global en_mantenimiento
+
     telefono = event.sender_id
     mensaje = event.message.text.strip()
     mensaje_normalizado = limpiar_tildes(mensaje.lower().strip())
@@ -911,16 +3714,29 @@ async def handler(event):
         )
         return
 
+    # Cargar usuario desde memoria o DB
+    if await sesion_de_jugador(telefono) is None:
+        usuarios[telefono] = {"estado": "esperando_nombre"}
+        await event.respond(
+            "¡Bienvenido a Diegol! Soy DIEBOT 🤖. Estoy todo el día a tu disposición "
+            "para cargar o retirar fichas, restablecer contraseñas, "
+            "y desbloquear usuarios."
+        )
+        await event.respond(
+            "No encontré un usuario asociado a tu número de teléfono en nuestro casino 😅\n"
+            "🧐 Decime tu nombre así te creamos uno (sin espacios, máx 12 caracteres)."
+        )
+        return
+
     # Menú rápido
     if mensaje_normalizado in ["menu", "volver", "volver al menu", "volver al menú"]:
-        usuarios.setdefault(telefono, {})
         usuarios[telefono]["estado"] = "opciones"
-        guardar_usuario_en_mysql(telefono, usuarios[telefono])
+        await persistencia_usuarios.guardar(telefono, usuarios[telefono])
 
         await event.respond("🔄 Volviendo al menú principal...")
         await event.respond(
             "👇 ¿Qué necesitás?\n"
-            f"*USUARIO:* {usuarios[telefono].get('usuario_creado', 'No asignado')}\n"
+            f"*USUARIO:* {usuarios[telefono].get('usuario_creado') or 'No asignado'}\n"
             "Escribí el número según lo que quieras hacer:\n"
             "1️⃣) Cargar fichas 🎰\n"
             "2️⃣) Retirar fichas 💸\n"
@@ -931,24 +3747,6 @@ async def handler(event):
         )
         return
 
-    # Cargar usuario desde memoria o DB
-    if telefono not in usuarios:
-        usuario_db = cargar_usuario_desde_mysql(telefono)
-        if usuario_db:
-            usuarios[telefono] = usuario_db
-        else:
-            usuarios[telefono] = {"estado": "esperando_nombre"}
-            await event.respond(
-                "¡Bienvenido a Diegol! Soy DIEBOT 🤖. Estoy todo el día a tu disposición "
-                "para cargar o retirar fichas, restablecer contraseñas, "
-                "y desbloquear usuarios."
-            )
-            await event.respond(
-                "No encontré un usuario asociado a tu número de teléfono en nuestro casino 😅\n"
-                "🧐 Decime tu nombre así te creamos uno (sin espacios, máx 12 caracteres)."
-            )
-            return
-
     estado = usuarios[telefono].get("estado")
 
     # A partir de acá se replica la lógica de tu flujo:
@@ -976,21 +3774,21 @@ async def handler(event):
         usuarios[telefono]["estado"] = "creando_usuario"
         mensaje_limpio = limpiar_tildes(mensaje)
         usuarios[telefono]["nombre_usuario"] = mensaje_limpio
+        await persistencia_usuarios.guardar(telefono, usuarios[telefono])
 
         nombre_usuario = generar_nombre_usuario(mensaje_limpio)
 
         await event.respond("⏳ Creando tu usuario, por favor esperá un momento...")
 
-        driver = iniciar_sesion_blueday()
-        exito = False
-        if driver:
-            exito = crear_usuario_en_blueday(driver, nombre_usuario)
-            driver.quit()
+        # Un reenvío del nombre espera su turno y llega con el estado ya en 'opciones',
+        # así que no crea un segundo usuario (se cuenta más abajo)
+        with tiempos_operaciones.medir(operacion="crear_usuario"):
+            exito = await executor_blueday.ejecutar(backend_blueday.crear_usuario, nombre_usuario)
 
         if exito:
             usuarios[telefono]["usuario_creado"] = nombre_usuario
             usuarios[telefono]["estado"] = "opciones"
-            guardar_usuario_en_mysql(telefono, usuarios[telefono])
+            await persistencia_usuarios.guardar(telefono, usuarios[telefono], inmediato=True)
 
             await event.respond(
                 "🔟 ¡Bienvenido a Diegol! 🔟\n"
@@ -1011,13 +3809,27 @@ async def handler(event):
             )
         else:
             usuarios[telefono]["estado"] = "esperando_nombre"
-            guardar_usuario_en_mysql(telefono, usuarios[telefono])
+            await persistencia_usuarios.guardar(telefono, usuarios[telefono])
             await event.respond(
                 "❌ Ocurrió un error al crear tu usuario. Intentá nuevamente más tarde."
             )
 
         return
 
+    # Reenvío del nombre que llegó mientras se creaba el usuario: el original
+    # ya lo creó, este no repite el alta
+    if (
+        estado == "opciones"
+        and usuarios[telefono].get("usuario_creado")
+        and limpiar_tildes(mensaje) == usuarios[telefono].get("nombre_usuario")
+    ):
+        reenvios_suprimidos.inc(operacion="crear_usuario")
+        await event.respond(
+            f"✅ Tu usuario ya está creado: {usuarios[telefono]['usuario_creado']}\n"
+            "Escribí `menu` para ver las opciones."
+        )
+        return
+
     # IMPORTANTE:
     # Acá deberías reinsertar TODO tu flujo de estados original
     # (confirmar_monto, retirar fichas, cambiar contraseña, etc.)
@@ -1037,8 +3849,70 @@ async def handler(event):
 # HANDLER ADMIN (OPERADOR)
 # ============================================================
 
+def _formato_latencia(histograma: Histograma, *operaciones: str) -> str:
+    p50 = histograma.percentil(50, operacion=operaciones)
+    p95 = histograma.percentil(95, operacion=operaciones)
+    if p50 is None:
+        return "sin datos"
+    return f"p50 {p50:.2f} s / p95 {p95:.2f} s"
+
+
+def resumen_rendimiento() -> str:
+    """
+    Foto del estado de los componentes para el comando 'rendimiento'.
+    """
+    sesiones = usuarios.estadisticas()
+    turnos = turnos_jugadores.estadisticas()
+    lineas = [
+        "📈 Rendimiento",
+        f"💰 Avisos de caja pendientes: {notificador_caja.pendientes()}",
+        f"🎰 BlueDay: {executor_blueday.pendientes} trabajos en cola/curso, "
+        f"{agrupador_cargas.pendientes()} cargas esperando tanda",
+        f"👥 Sesiones en memoria: {sesiones['sesiones']} "
+        f"(aciertos {sesiones['aciertos']}, fallos {sesiones['fallos']}, "
+        f"desalojos {sesiones['desalojos']}), "
+        f"{persistencia_usuarios.pendientes()} sin volcar a MySQL",
+        f"🚦 Turnos: {turnos['jugadores_activos']} jugadores con {turnos['en_cola']} operaciones "
+        f"en curso/cola ({turnos['encolados']} esperaron a otra propia, "
+        f"{reenvios_suprimidos.total():.0f} reenvíos no repitieron la operación)",
+    ]
+    if turnos["calientes"]:
+        lineas.append("🔥 Más cargados: " + ", ".join(
+            f"{tid} ({en_cola})" for tid, en_cola in turnos["calientes"]
+        ))
+    lineas += [
+        f"🧹 Último vencimiento: {estadisticas_vencimiento['eliminados']} movimientos en "
+        f"{estadisticas_vencimiento['segundos']:.2f} s ({estadisticas_vencimiento['total']} desde el arranque)",
+        "⏱️ Últimas operaciones:",
+        # Cargas y retiros, lo que tarda BlueDay (una tanda de cargas cuenta una vez);
+        # las altas, de punta a punta desde el mensaje del jugador
+        f"- Cargas en BlueDay: {_formato_latencia(tiempos_blueday, 'cargar_fichas', 'cargar_fichas_lote')}",
+        f"- Retiros en BlueDay: {_formato_latencia(tiempos_blueday, 'retirar_fichas')}",
+        f"- Altas: {_formato_latencia(tiempos_operaciones, 'crear_usuario')}",
+    ]
+
+    lectores = motor_correo.estado()
+    lineas.append(f"📬 Lectores de correo: {len(lectores)}")
+    for lector in lectores:
+        icono = "🟢" if lector["vivo"] and lector["atraso"] < 60 else "🔴"
+        if not lector["vivo"]:
+            detalle = "caído"
+        else:
+            detalle = f"{lector['estado']}, atraso {lector['atraso']:.0f} s"
+        if lector["ultimo_error"]:
+            detalle += f", {lector['errores']} errores"
+        lineas.append(f"{icono} {lector['alias']}: {detalle}")
+
+    return "\n".join(lineas)
+
+
 @client.on(events.NewMessage(from_users=lambda u: u == OPERADOR_ID))
 async def admin_handler(event):
+    with tiempos_handler.medir(handler="operador"):
+        await atender_operador(event)
+
+
+async def atender_operador(event):
     global en_mantenimiento
 
     comando = event.message.text.strip()
@@ -1058,6 +3932,9 @@ async def admin_handler(event):
         estado_str = "🟡 MANTENIMIENTO" if en_mantenimiento else "🟢 ACTIVO"
         await event.respond(f"📊 Estado actual del bot: {estado_str}")
 
+    elif comando.lower() == "rendimiento":
+        await event.respond(resumen_rendimiento())
+
     elif comando.lower().startswith("agregar cuenta"):
         try:
             partes = comando.split(" ", 2)
@@ -1090,8 +3967,9 @@ async def admin_handler(event):
             ) = [x.strip() for x in datos]
             password = password.replace(" ", "")
 
-            ok = agregar_cuenta(
-                nombre_interno, alias_banco, cbu, email_cuenta, password, titular
+            ok = await db_async(
+                agregar_cuenta,
+                nombre_interno, alias_banco, cbu, email_cuenta, password, titular,
             )
             if ok:
                 await event.respond(
@@ -1110,7 +3988,7 @@ async def admin_handler(event):
             await event.respond(f"❌ Error al agregar cuenta: {e}")
 
     elif comando.lower() == "listar cuentas":
-        cuentas = listar_cuentas()
+        cuentas = await db_async(listar_cuentas)
         if cuentas:
             msg = "📋 Cuentas registradas:\n"
             for c in cuentas:
@@ -1134,7 +4012,7 @@ async def admin_handler(event):
                 return
 
             alias_a_borrar = partes[2].strip()
-            if borrar_cuenta(alias_a_borrar):
+            if await db_async(borrar_cuenta, alias_a_borrar):
                 await event.respond(
                     f"✅ La cuenta {alias_a_borrar} fue eliminada correctamente."
                 )
@@ -1148,7 +4026,8 @@ async def admin_handler(event):
     else:
         await event.respond(
             "❌ Comando no reconocido. Usa:\n"
-            "mantenimiento / reanudar / estado / agregar cuenta / borrar cuenta / listar cuentas"
+            "mantenimiento / reanudar / estado / rendimiento / agregar cuenta / borrar cuenta / "
+            "listar cuentas"
         )
 
 
@@ -1158,20 +4037,49 @@ async def admin_handler(event):
 
 async def main():
     print("🔄 Iniciando el bot...")
+    notificador_caja.iniciar(asyncio.get_running_loop())
+
+    # Los lectores de correo corren como tareas en este mismo loop
+    motor_correo.iniciar(asyncio.get_running_loop())
+    await db_async(iniciar_extraccion_automatica)
+
     await client.start(phone_number)
     print("✅ Bot conectado, esperando mensajes...")
 
     # Lanza la tarea que procesa la cola de avisos de caja
     client.loop.create_task(procesar_cola())
 
+    # Vence las sesiones de usuarios inactivas
+    client.loop.create_task(purgar_sesiones())
+
+    # Vuelca a MySQL los cambios de estado de los usuarios
+    client.loop.create_task(persistencia_usuarios.procesar())
+
     # Corre hasta que se desconecte
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        await persistencia_usuarios.volcar()
+        executor_blueday.cerrar()
+        # Cierra los Chrome (también los que tengan un trabajo a medias)
+        await asyncio.to_thread(pool_blueday.cerrar)
 
 
 if __name__ == "__main__":
+    asegurar_esquema()
+
+    # Depósitos todavía vigentes de antes del reinicio
+    try:
+        print(f"💰 {indice_depositos.precargar()} depósitos vigentes en el índice.")
+    except Exception as e:
+        print(f"⚠️ No se pudo precargar el índice de depósitos: {e}")
+
     # Inicia hilos/generadores auxiliares
-    iniciar_extraccion_automatica()
     iniciar_eliminacion_automatica()
+    iniciar_servidor_metricas()
+
+    # Abre y loguea los navegadores de BlueDay sin demorar el arranque del bot
+    threading.Thread(target=pool_blueday.precalentar, daemon=True).start()
 
     # Arranca el bot de Telegram
     asyncio.run(main())